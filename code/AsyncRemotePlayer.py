@@ -0,0 +1,223 @@
+"""
+Non-blocking remote computer player.
+
+AsyncRemotePlayer talks to the same assistant as ComputerGPTPlayer but never sleeps the
+process: the run is polled with exponential backoff on the event loop, every move has a
+deadline and a local player answers instead when the remote one fails, times out or
+replies with something that is not a move. Many games can run against the remote player
+at once on one event loop:
+
+    records = asyncio.run(play_games(16, board_size=5))
+
+The client is injected. It must look like openai.AsyncOpenAI (beta.threads.create,
+messages.create/list, runs.create/retrieve/cancel, all awaitable); by default an
+AsyncOpenAI client is made, which honours OPENAI_BASE_URL so it can also be pointed at a
+local stub server.
+"""
+import asyncio
+import os
+import re
+import PromptPayload as prompt
+import RulesEngine as rules
+import SelfPlay as selfplay
+
+# Run statuses after which polling stops
+TERMINAL_STATUSES = {'completed', 'failed', 'cancelled', 'expired', 'incomplete', 'requires_action'}
+
+MOVE_PATTERN = re.compile(r'move_str:\s*(\S+)')
+
+
+class AsyncRemotePlayer():
+    """
+    Remote assistant player with backoff polling, a per-move deadline and a local fallback.
+
+    `get_play_async` is the coroutine; `get_play` wraps it on a private event loop so the
+    player can also stand in for ComputerGPTPlayer in synchronous code. `fallback` is any
+    player with get_play (a RandomPlayer by default). `fallbacks` counts the moves it made
+    and `last_status` holds the final status of the last run.
+    """
+
+    def __init__(self,
+                 mode: str = 'medium',
+                 board_size: int = 5,
+                 stone_color: str = 'white',
+                 client = None,
+                 assistant_id = None,
+                 move_deadline = 60.0,
+                 poll_initial = 0.25,
+                 poll_max = 4.0,
+                 poll_factor = 2.0,
+                 fallback = None,
+                 payload_mode = 'delta',
+                 seed = None):
+        self.mode = mode
+        self.board_size = board_size
+        self.stone_color = stone_color
+        self.client = client
+        self.assistant_id = assistant_id if assistant_id is not None else os.environ.get('ASSISTANT_API')
+        self.move_deadline = move_deadline
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        if fallback is None:
+            import RandomPlayer as random_player
+            fallback = random_player.RandomPlayer(board_size=board_size, stone_color=stone_color, seed=seed)
+        self.fallback = fallback
+        self.prompt = prompt.PromptEncoder(board_size, payload_mode)
+
+        self.thread_id = None
+        self.run_id = None
+        self.last_status = None
+        self.fallbacks = 0
+        self.loop = None
+        # Set by Instrumentation.Profiler.instrument_player to count round-trips and polls
+        self.profiler = None
+
+    def get_play(self, move_str, board, board_history, captured_stones) -> str:
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        return self.loop.run_until_complete(self.get_play_async(move_str, board, board_history, captured_stones))
+
+    async def get_play_async(self, move_str, board, board_history, captured_stones) -> str:
+        try:
+            move = await asyncio.wait_for(self.remote_move(move_str, board, board_history, captured_stones),
+                                          timeout=self.move_deadline)
+        except asyncio.TimeoutError:
+            self.last_status = 'timeout'
+            await self.cancel_run()
+            move = None
+        except Exception as error:
+            # Network and API errors are answered locally, the game goes on
+            self.last_status = f'error: {error}'
+            move = None
+
+        if move is None:
+            self.fallbacks += 1
+            if self.profiler is not None:
+                self.profiler.count('remote_fallbacks')
+            # The assistant never made this move, the next message has to carry the whole board
+            self.prompt.forget()
+            move = self.fallback.get_play(move_str, board, board_history, captured_stones)
+        else:
+            self.prompt.answered(move)
+        return move
+
+    async def remote_move(self, move_str, board, board_history, captured_stones):
+        client = self.get_client()
+        threads = client.beta.threads
+        if self.profiler is not None:
+            self.profiler.count('remote_round_trips')
+        if self.thread_id is None:
+            self.thread_id = (await threads.create()).id
+
+        await threads.messages.create(thread_id=self.thread_id, role="user",
+                                      content=self.prompt.payload(move_str, board, board_history, captured_stones))
+        run = await threads.runs.create(thread_id=self.thread_id,
+                                        assistant_id=self.assistant_id,
+                                        instructions=f'You are playing in {self.mode} mode as {self.stone_color} stone colors a {self.board_size}x{self.board_size}x{self.board_size} Go Game. You always respond with "move_str: MYMOVE", where MYMOVE is your move. {prompt.INSTRUCTIONS}')
+        self.run_id = run.id
+
+        status = await self.wait_for_run(run)
+        self.run_id = None
+        if status != 'completed':
+            return None
+
+        messages = await threads.messages.list(thread_id=self.thread_id, order='desc', limit=1)
+        for message in messages.data:
+            if message.role == 'assistant' and message.content and message.content[0].type == 'text':
+                return self.extract_move_str(message.content[0].text.value)
+        return None
+
+    async def wait_for_run(self, run):
+        """Poll the run with exponential backoff until it reaches a terminal status."""
+        delay = self.poll_initial
+        status = run.status
+        while status not in TERMINAL_STATUSES:
+            await asyncio.sleep(delay)
+            if self.profiler is not None:
+                self.profiler.count('remote_polls')
+            delay = min(delay * self.poll_factor, self.poll_max)
+            status = (await self.get_client().beta.threads.runs.retrieve(thread_id=self.thread_id, run_id=run.id)).status
+        self.last_status = status
+        return status
+
+    async def cancel_run(self):
+        """Best-effort cancel of a run that went past its deadline."""
+        if self.run_id is None:
+            return
+        run_id, self.run_id = self.run_id, None
+        try:
+            await asyncio.wait_for(self.get_client().beta.threads.runs.cancel(thread_id=self.thread_id, run_id=run_id),
+                                   timeout=self.poll_max)
+        except Exception:
+            pass
+
+    def get_client(self):
+        if self.client is None:
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI()
+        return self.client
+
+    def extract_move_str(self, text):
+        match = MOVE_PATTERN.search(text)
+        return match.group(1) if match else None
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
+
+
+async def play_game(game_id, board_size, remote, opponent, remote_color='white', max_moves=None):
+    """Play one headless game between an AsyncRemotePlayer and a local player; returns a SelfPlay-style record."""
+    engine = rules.RulesEngine(board_size)
+    players = {remote_color: remote, ('black' if remote_color == 'white' else 'white'): opponent}
+
+    moves = []
+    max_moves = max_moves or 3 * board_size ** 3
+    while not engine.game_over and len(moves) < max_moves:
+        player = players[engine.current_player]
+        for _ in range(selfplay.MAX_ATTEMPTS):
+            args = (engine.last_move, engine.board, engine.board_history, engine.captured_stones)
+            move_str = await player.get_play_async(*args) if player is remote else player.get_play(*args)
+            if move_str and engine.play(move_str):
+                break
+        else:
+            move_str = 'p'
+            engine.play(move_str)
+        moves.append(move_str)
+        # Let the other games run between local moves too
+        await asyncio.sleep(0)
+
+    result = engine.result if engine.result is not None else engine.determine_winner()
+    return {
+        'game_id': game_id,
+        'board_size': board_size,
+        'black': 'remote' if remote_color == 'black' else 'local',
+        'white': 'remote' if remote_color == 'white' else 'local',
+        'winner': result['winner'],
+        'scores': {'black': result['black'], 'white': result['white']},
+        'captured_stones': dict(engine.captured_stones),
+        'moves': moves,
+        'fallbacks': remote.fallbacks,
+    }
+
+
+async def play_games(num_games, board_size=5, remote_color='white', opponent='random', client=None,
+                     max_moves=None, seed=0, **remote_options):
+    """
+    Play `num_games` games against the remote player concurrently on the running event loop.
+
+    Every game gets its own AsyncRemotePlayer (and so its own assistant thread) sharing one
+    client; `opponent` is a SelfPlay player name or 'module:ClassName'.
+    """
+    local_color = 'black' if remote_color == 'white' else 'white'
+    games = []
+    for game_id in range(num_games):
+        black_seed, white_seed = selfplay.game_seeds(seed, game_id)
+        remote_seed, local_seed = (black_seed, white_seed) if remote_color == 'black' else (white_seed, black_seed)
+        remote = AsyncRemotePlayer(board_size=board_size, stone_color=remote_color, client=client,
+                                   seed=remote_seed, **remote_options)
+        local = selfplay.make_player(opponent, board_size, local_color, local_seed)
+        games.append(play_game(game_id, board_size, remote, local, remote_color, max_moves))
+    return await asyncio.gather(*games)
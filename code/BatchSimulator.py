@@ -0,0 +1,451 @@
+import numpy as np
+import BoardGeometry as geometry
+import Scoring as scoring
+import Zobrist as zobrist
+
+# Random empty cells a game tries after a first miss before random_moves tries all of them
+MOVE_PROBES = 4
+
+# Set bits of every byte value, for NumPy releases without bitwise_count
+BYTE_POPCOUNT = np.array([bin(b).count('1') for b in range(256)], dtype=np.int32)
+
+
+def popcount(words):
+    """Set bits of every row of a (..., num_words) uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+    return BYTE_POPCOUNT[np.ascontiguousarray(words).view(np.uint8)].sum(axis=-1)
+
+
+class BatchSimulator:
+    """
+    Many 3D Go games advanced together with array operations.
+
+    All boards live in one (num_games, num_cells) int8 array `cells`; `boards` returns them
+    as (num_games, size, size, size). Each call to `step` applies one move per game (a flat
+    cell index, or -1 to pass) and resolves captures, suicide and positional superko for
+    every game at once, following the same rules as RulesEngine.make_move:
+
+    - a stone may only go on an empty cell,
+    - opponent chains left without liberties are removed,
+    - a move that leaves its own chain without liberties and captures nothing is refused,
+    - a move that recreates any earlier position of that game is refused.
+
+    Chains are kept the way GroupTracker keeps them, as a union-find forest with the
+    liberties of every chain at its root, here as a bitset and its count. A move only
+    touches the chains next to the played cell and, when it captures, the chains next to the
+    removed stones; legality is read off the counts of the neighbouring chains, so neither
+    `step` nor `legal_moves` ever recounts liberties. A refused move leaves its game
+    unchanged, is banned for that turn and the same side has to move again. A game ends
+    after two consecutive passes or after `max_moves` turns.
+
+    Every game has num_cells + 1 slots, the last one an off-board sentinel that the padded
+    neighbour matrix points at; the chain arrays are indexed by game * (num_cells + 1) + cell.
+    """
+
+    def __init__(self, num_games, board_size, max_moves=None, seed=None):
+        self.num_games = num_games
+        self.board_size = board_size
+        self.geometry = geometry.get_geometry(board_size)
+        self.num_cells = n = self.geometry.num_cells
+        self.max_moves = max_moves if max_moves is not None else 3 * n
+        self.rng = np.random.default_rng(seed)
+        self.neighbors = self.geometry.neighbor_matrix
+
+        self.stride = n + 1
+        self.offsets = np.arange(num_games, dtype=np.int32) * self.stride
+        self.board = np.zeros((num_games, self.stride), dtype=np.int8)
+        self.board[:, n] = -1
+        self.cells = self.board[:, :n]
+        self.flat_board = self.board.reshape(-1)
+
+        # Bitsets over the cells of one board: every cell, the neighbours of every cell
+        self.num_words = (n + 63) // 64
+        cells = np.arange(n)
+        self.cell_bits = np.zeros((self.stride, self.num_words), dtype=np.uint64)
+        self.cell_bits[cells, cells // 64] = np.uint64(1) << (cells % 64).astype(np.uint64)
+        self.neighbor_bits = np.bitwise_or.reduce(self.cell_bits[self.neighbors], axis=1)
+        self.empty_bits = np.tile(np.bitwise_or.reduce(self.cell_bits, axis=0), (num_games, 1))
+
+        # Union-find forest of the chains; size, libs and bits are only meaningful at roots
+        self.parent = np.arange(num_games * self.stride, dtype=np.int32)
+        self.size = np.ones(num_games * self.stride, dtype=np.int32)
+        self.libs = np.zeros(num_games * self.stride, dtype=np.int32)
+        self.bits = np.zeros((num_games * self.stride, self.num_words), dtype=np.uint64)
+        self.marked = np.zeros(num_games * self.stride, dtype=bool)
+
+        # The first empty_count[g] entries of empty_cells[g] are the empty cells of game g in
+        # some order, and empty_index[g, c] is the position of cell c in that list
+        self.empty_cells = np.tile(np.arange(n, dtype=np.int32), (num_games, 1))
+        self.empty_index = self.empty_cells.copy()
+        self.empty_count = np.full(num_games, n, dtype=np.int32)
+
+        self.to_move = np.ones(num_games, dtype=np.int8)
+        self.passes = np.zeros(num_games, dtype=np.int8)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.move_count = np.zeros(num_games, dtype=np.int32)
+        self.captured = np.zeros((num_games, 2), dtype=np.int32)  # stones captured by black, by white
+        self.moves = np.full((num_games, self.max_moves), -2, dtype=np.int32)  # -1 pass, -2 not played
+        self.banned = np.zeros((num_games, n), dtype=bool)
+
+        # Superko: every position of a game is kept in its row of an open-addressing table
+        # of hashes plus one (0 marks a free slot), at most half full
+        self.keys = zobrist.get_keys(board_size)
+        table_size = 1 << int(2 * (self.max_moves + 1) - 1).bit_length()
+        self.table_mask = np.uint64(table_size - 1)
+        self.positions = np.zeros((num_games, table_size), dtype=np.uint64)
+        self.hashes = np.full(num_games, np.bitwise_xor.reduce(self.keys[0]), dtype=np.uint64)
+        self.remember(np.arange(num_games), self.hashes)
+
+    @property
+    def boards(self):
+        return self.cells.reshape((self.num_games,) + (self.board_size,) * 3)
+
+    def load(self, cells):
+        """Start every game from the given (num_games, num_cells) positions, black to move."""
+        n = self.num_cells
+        self.cells[:] = np.asarray(cells, dtype=np.int8).reshape(self.cells.shape)
+        labels = self.label_chains(self.cells)
+
+        stone = labels < n
+        slots = self.offsets[:, None] + np.arange(n, dtype=np.int32)
+        roots = np.where(stone, self.offsets[:, None] + labels, slots)
+        self.parent[:] = np.arange(self.parent.size)
+        self.parent[slots] = roots
+        self.size[:] = np.maximum(np.bincount(roots[stone], minlength=self.size.size), 1)
+
+        # Every empty cell is a liberty of the chains of its neighbouring stones
+        empty = self.cells == 0
+        self.empty_bits[:] = np.bitwise_or.reduce(np.where(empty[..., None], self.cell_bits[:n], np.uint64(0)), axis=1)
+        self.bits[:] = 0
+        games, cells = np.nonzero(empty)
+        around = self.offsets[games, None] + self.neighbors[cells]
+        touching = self.flat_board[around] > 0
+        liberties = np.broadcast_to(cells[:, None], around.shape)[touching]
+        np.bitwise_or.at(self.bits, (self.parent[around[touching]], liberties // 64),
+                         self.cell_bits[liberties, liberties // 64])
+        self.libs[:] = popcount(self.bits)
+
+        # Empty cells first, each list in cell order
+        order = np.argsort(~empty, axis=1, kind='stable').astype(np.int32)
+        self.empty_cells[:] = order
+        np.put_along_axis(self.empty_index, order, np.arange(n, dtype=np.int32)[None], axis=1)
+        self.empty_count[:] = np.count_nonzero(empty, axis=1)
+
+        self.hashes[:] = np.bitwise_xor.reduce(self.keys[self.cells, np.arange(n)], axis=1)
+        self.positions[:] = 0
+        self.remember(np.arange(self.num_games), self.hashes)
+        self.to_move[:] = 1
+        self.passes[:] = 0
+        self.done[:] = False
+        self.move_count[:] = 0
+        self.captured[:] = 0
+        self.moves[:] = -2
+        self.banned[:] = False
+
+    def label_chains(self, cells):
+        """
+        Label the chains of arbitrary boards from scratch.
+
+        The larger label of every same-colour edge is hooked onto the smaller one and all
+        pointers are shortcut to their roots; a handful of rounds connects every chain.
+        Returns (num_games, num_cells) labels, each the smallest cell index of its chain.
+        """
+        num_games, n = cells.shape
+        total = cells.size
+        flat = cells.reshape(-1)
+        stone = flat != 0
+
+        offsets = (np.arange(num_games, dtype=np.int32) * n)[:, None, None]
+        nbr = np.where(self.neighbors == n, total, self.neighbors[None] + offsets).reshape(total, -1)
+        padded_colors = np.append(flat, -1).astype(np.int8)
+        same = (padded_colors[nbr] == flat[:, None]) & stone[:, None]
+        src = np.broadcast_to(np.arange(total, dtype=np.int32)[:, None], nbr.shape)[same]
+        dst = nbr[same]
+
+        labels = np.append(np.where(stone, np.arange(total), total), total).astype(np.int32)
+        while True:
+            label_src, label_dst = labels[src], labels[dst]
+            differ = label_src != label_dst
+            if not differ.any():
+                break
+            label_src, label_dst = label_src[differ], label_dst[differ]
+            np.minimum.at(labels, np.maximum(label_src, label_dst), np.minimum(label_src, label_dst))
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+
+        labels = labels[:total].reshape(cells.shape)
+        return np.where(labels == total, n, labels % n).astype(np.int32)
+
+    def find(self, slots):
+        """Chain roots of an array of slots, which are shortcut to them; empty cells are their own roots."""
+        roots = self.parent[slots]
+        while True:
+            up = self.parent[roots]
+            if np.array_equal(up, roots):
+                break
+            roots = up
+        self.parent[slots] = roots
+        return roots
+
+    def neighborhood(self, games, cells):
+        """Colours, chain roots and chain liberties of the six neighbours of `cells` in `games`."""
+        around = self.offsets[games][..., None] + self.neighbors[cells]
+        roots = self.find(around)
+        return self.flat_board[around], roots, self.libs[roots]
+
+    @staticmethod
+    def playable(colors, libs, color):
+        """
+        (playable, captures) from the colours and chain liberties of the neighbours of a
+        move: it is playable if it touches an empty cell, a friendly chain with more than one
+        liberty or an opponent chain in atari, which it captures.
+        """
+        color = np.asarray(color)[..., None]
+        captures = ((colors == 3 - color) & (libs == 1)).any(axis=-1)
+        playable = (colors == 0).any(axis=-1) | ((colors == color) & (libs > 1)).any(axis=-1) | captures
+        return playable, captures
+
+    def seen(self, games, hashes):
+        """Which of the position `hashes` already occurred in their game."""
+        stored = hashes + np.uint64(1)
+        slots = (stored & self.table_mask).astype(np.int64)
+        found = np.zeros(len(games), dtype=bool)
+        pending = np.arange(len(games))
+        while pending.size:
+            values = self.positions[games[pending], slots[pending]]
+            hit = values == stored[pending]
+            found[pending[hit]] = True
+            pending = pending[~hit & (values != 0)]
+            slots[pending] = (slots[pending] + 1) & int(self.table_mask)
+        return found
+
+    def remember(self, games, hashes):
+        """Add one new position hash per game (each game at most once) to the superko table."""
+        stored = hashes + np.uint64(1)
+        slots = (stored & self.table_mask).astype(np.int64)
+        pending = np.arange(len(games))
+        while pending.size:
+            free = self.positions[games[pending], slots[pending]] == 0
+            taken = pending[free]
+            self.positions[games[taken], slots[taken]] = stored[taken]
+            pending = pending[~free]
+            slots[pending] = (slots[pending] + 1) & int(self.table_mask)
+
+    def liberty_counts(self):
+        """(num_games, num_cells) liberties of the chain of every stone, 0 on empty cells."""
+        libs = self.libs[self.find(np.arange(self.parent.size, dtype=np.int32))].reshape(self.board.shape)[:, :self.num_cells]
+        return np.where(self.cells != 0, libs, 0)
+
+    def legal_moves(self, games=None):
+        """
+        (num_games, num_cells) bool mask of the moves the side to move may play in each game,
+        or only the rows of `games`. Superko is left to `step`, which refuses and bans a
+        repeating move.
+        """
+        if games is None:
+            games = np.arange(self.num_games)
+        board = self.board[games]
+        libs = self.libs[self.find(self.offsets[games, None] + np.arange(self.stride, dtype=np.int32))]
+
+        legal, _ = self.playable(board[:, self.neighbors], libs[:, self.neighbors], self.to_move[games, None])
+        legal &= (board[:, :self.num_cells] == 0) & ~self.banned[games]
+        legal[self.done[games]] = False
+        return legal
+
+    def step(self, moves):
+        """
+        Play one move per game (flat cell index, -1 to pass); finished games are skipped.
+
+        Returns a bool array telling which games accepted their move.
+        """
+        moves = np.asarray(moves)
+        n = self.num_cells
+        active = ~self.done
+        passing = active & (moves < 0)
+        games = np.flatnonzero(active & (moves >= 0))
+        cells = moves[games]
+        empty = self.board[games, cells] == 0
+        self.banned[games[~empty], cells[~empty]] = True
+        games, cells = games[empty], cells[empty]
+        color = self.to_move[games]
+
+        colors, roots, libs = self.neighborhood(games, cells)
+        ok, captures = self.playable(colors, libs, color)
+
+        # The stones of the opponent chains in atari next to a capturing move die with it
+        capturing = np.flatnonzero(ok & captures)
+        dead_roots = roots[capturing][((colors == (3 - color)[:, None]) & (libs == 1))[capturing]]
+        self.marked[dead_roots] = True
+        dead = self.marked[self.find(self.offsets[games[capturing], None] + np.arange(n, dtype=np.int32))]
+        self.marked[dead_roots] = False
+
+        new_hash = self.hashes[games] ^ self.keys[color, cells]
+        opponent_keys = self.keys[3 - color[capturing]]
+        new_hash[capturing] ^= np.bitwise_xor.reduce(np.where(dead, opponent_keys, np.uint64(0)), axis=1)
+        candidates = np.flatnonzero(ok)
+        ok[candidates[self.seen(games[candidates], new_hash[candidates])]] = False
+        self.banned[games[~ok], cells[~ok]] = True
+
+        dead = dead[ok[capturing]]
+        games, cells, color, colors, roots, captures, new_hash = (
+            array[ok] for array in (games, cells, color, colors, roots, captures, new_hash))
+        self.place(games, cells, color, colors, roots)
+        self.remove(games[captures], color[captures], dead)
+        self.captured[games[captures], color[captures] - 1] += dead.sum(axis=1)
+        self.hashes[games] = new_hash
+        self.remember(games, new_hash)
+
+        accepted = passing.copy()
+        accepted[games] = True
+        self.moves[accepted, self.move_count[accepted]] = np.where(passing, -1, moves)[accepted]
+        self.move_count[accepted] += 1
+        self.passes[passing] += 1
+        self.passes[games] = 0
+        self.to_move[accepted] = 3 - self.to_move[accepted]
+        self.banned[accepted] = False
+        self.done |= (self.passes >= 2) | (self.move_count >= self.max_moves)
+        return accepted
+
+    def place(self, games, cells, color, colors, roots):
+        """
+        Put accepted stones on the board: the opponent chains next to each lose that liberty
+        and the friendly ones merge with the stone under the root of the largest of them.
+        `colors` and `roots` describe the neighbours before the move.
+        """
+        rows = np.arange(len(games))
+        stones = self.offsets[games] + cells
+        words = cells // 64
+        bits = self.cell_bits[cells, words]
+        self.flat_board[stones] = color
+        self.empty_bits[games, words] &= ~bits
+        last = self.empty_count[games] - 1
+        position, moved = self.empty_index[games, cells], self.empty_cells[games, last]
+        self.empty_cells[games, position] = moved
+        self.empty_index[games, moved] = position
+        self.empty_count[games] = last
+
+        # A chain next to the stone more than once counts once, at the first of its sorted roots
+        ordered = np.sort(np.where(colors == (3 - color)[:, None], roots, -1), axis=1)
+        first = ordered >= 0
+        first[:, 1:] &= ordered[:, 1:] != ordered[:, :-1]
+        near, side = np.nonzero(first)
+        chains = ordered[near, side]
+        self.bits[chains, words[near]] &= ~bits[near]
+        self.libs[chains] -= 1
+
+        ordered = np.sort(np.where(colors == color[:, None], roots, -1), axis=1)
+        first = ordered >= 0
+        first[:, 1:] &= ordered[:, 1:] != ordered[:, :-1]
+        sizes = np.where(first, self.size[ordered], 0)
+        root = np.where(first.any(axis=1), ordered[rows, sizes.argmax(axis=1)], stones)
+
+        merged = self.neighbor_bits[cells] & self.empty_bits[games]
+        near, side = np.nonzero(first)
+        chains = ordered[near, side]
+        if near.size:
+            # near is sorted, so the chains of one stone are consecutive
+            starts = np.flatnonzero(np.diff(near, prepend=-1))
+            merged[near[starts]] |= np.bitwise_or.reduceat(self.bits[chains], starts, axis=0)
+        merged[rows, words] &= ~bits
+        self.parent[chains] = root[near]
+        self.parent[stones] = root
+        self.size[root] = sizes.sum(axis=1) + 1
+        self.bits[root] = merged
+        self.libs[root] = popcount(merged)
+
+    def remove(self, games, color, dead):
+        """Take the `dead` (len(games), num_cells) stones off and give their cells to `color` as liberties."""
+        rows, cells = np.nonzero(dead)
+        owners = games[rows]
+        slots = self.offsets[owners] + cells
+        words = cells // 64
+        self.flat_board[slots] = 0
+        self.parent[slots] = slots
+        np.bitwise_or.at(self.empty_bits, (owners, words), self.cell_bits[cells, words])
+        counts = dead.sum(axis=1)
+        position = self.empty_count[owners] + np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.empty_cells[owners, position] = cells
+        self.empty_index[owners, cells] = position
+        self.empty_count[games] += counts
+
+        around = self.offsets[owners, None] + self.neighbors[cells]
+        touching = self.flat_board[around] == color[rows, None]
+        chains = self.find(around[touching])
+        liberties = np.broadcast_to(cells[:, None], around.shape)[touching]
+        np.bitwise_or.at(self.bits, (chains, liberties // 64), self.cell_bits[liberties, liberties // 64])
+        self.libs[chains] = popcount(self.bits[chains])
+
+    def random_moves(self, legal=None, weights=None):
+        """
+        Pick one legal move per game, uniformly or proportionally to `weights`.
+
+        `weights` is an optional (num_games, num_cells) array of non-negative move
+        probabilities from a policy. Games without a legal move pass. Without a mask or
+        weights the moves are found by trying random empty cells and keeping the first
+        playable one, which is a uniform pick as well, instead of building the whole mask.
+        """
+        if legal is None and weights is None:
+            return self.probe_moves()
+        if legal is None:
+            legal = self.legal_moves()
+        keys = self.rng.random(legal.shape)
+        if weights is not None:
+            # Weighted sampling without replacement keeps the key u ** (1 / w) with the largest value
+            with np.errstate(divide='ignore'):
+                keys = keys ** (1.0 / np.asarray(weights))
+        keys[~legal] = -1.0
+        moves = keys.argmax(axis=1)
+        moves[~legal.any(axis=1)] = -1
+        return moves
+
+    def probe_moves(self):
+        moves = np.full(self.num_games, -1, dtype=np.int64)
+        games = np.flatnonzero(~self.done & (self.empty_count > 0))
+        # One random empty cell settles most games and MOVE_PROBES more most of the rest; the
+        # few games left, often with no legal move at all, try every empty cell
+        for probes in (1, MOVE_PROBES, None):
+            if not games.size:
+                break
+            counts = self.empty_count[games, None]
+            if probes is None:
+                widest = counts.max()
+                picks = np.broadcast_to(np.arange(widest, dtype=np.int32), (len(games), widest))
+            else:
+                picks = (self.rng.random((len(games), probes)) * counts).astype(np.int32)
+            games_2d = np.broadcast_to(games[:, None], picks.shape)
+            cells = self.empty_cells[games_2d, picks]
+            colors, _, libs = self.neighborhood(games_2d, cells)
+            ok, _ = self.playable(colors, libs, self.to_move[games_2d])
+            ok &= (picks < counts) & ~self.banned[games_2d, cells]
+
+            found = ok.any(axis=1)
+            choice = (ok if probes is not None else np.where(ok, self.rng.random(ok.shape), -1.0)).argmax(axis=1)
+            moves[games[found]] = cells[found, choice[found]]
+            games = games[~found]
+        return moves
+
+    def run(self, policy=None):
+        """
+        Play every game to the end.
+
+        `policy(simulator, legal)` may return a (num_games, num_cells) weight array; without
+        one the moves are uniformly random.
+        """
+        while not self.done.all():
+            if policy is None:
+                self.step(self.random_moves())
+                continue
+            legal = self.legal_moves()
+            self.step(self.random_moves(legal, policy(self, legal)))
+
+    def scores(self):
+        """(num_games, 2) territory scores for black and white."""
+        result = np.zeros((self.num_games, 2), dtype=np.int32)
+        for g in range(self.num_games):
+            owners = scoring.territory_owners(self.cells[g], self.board_size)
+            result[g] = np.count_nonzero(owners == 1), np.count_nonzero(owners == 2)
+        return result
@@ -0,0 +1,193 @@
+import functools
+import numpy as np
+import BoardGeometry as geometry
+
+
+class BitMasks:
+    """
+    Precomputed masks for bitboards of a board_size**3 cube.
+
+    A set of cells is a Python int with bit i set for flat cell i (see BoardGeometry), so
+    cell i + 1 is the +z neighbour, i + size the +y one and i + size**2 the +x one. A shift
+    is only valid for cells that are not on the face it would cross; the `not_*` masks clear
+    those cells before shifting so nothing wraps onto the next row or layer.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.num_cells = n = board_size ** 3
+        self.full = (1 << n) - 1
+        x, y, z = np.indices((board_size,) * 3).reshape(3, -1)
+        self.not_z_last = to_mask(z < board_size - 1)
+        self.not_z_first = to_mask(z > 0)
+        self.not_y_last = to_mask(y < board_size - 1)
+        self.not_y_first = to_mask(y > 0)
+        self.row = board_size
+        self.layer = board_size * board_size
+
+
+@functools.lru_cache(maxsize=None)
+def get_masks(board_size) -> BitMasks:
+    return BitMasks(board_size)
+
+
+def to_mask(flags):
+    """Bitboard of the True entries of a flat bool array."""
+    return int.from_bytes(np.packbits(np.asarray(flags, dtype=bool), bitorder='little').tobytes(), 'little')
+
+
+def to_flags(mask, num_cells):
+    """Flat bool array of the cells set in a bitboard."""
+    data = np.frombuffer(mask.to_bytes((num_cells + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(data, bitorder='little')[:num_cells].astype(bool)
+
+
+def bits(mask):
+    """Cell indices set in a bitboard, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardGroups:
+    """
+    Chain queries answered with bitboards, as an alternative to GroupTracker.
+
+    Each colour is one int bitset. Nothing is kept per chain: a chain is grown from a stone
+    by repeated shift-and-mask dilation over the six axis directions, and its liberties are
+    one more dilation masked with the empty cells. It offers the GroupTracker interface
+    (a chain is identified by its lowest cell index), so BoardState and RulesEngine can use
+    either backend.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.geometry = geometry.get_geometry(board_size)
+        self.num_cells = self.geometry.num_cells
+        self.neighbors = self.geometry.neighbors
+        self.index = self.geometry.index
+        self.coords = self.geometry.coords
+        self.masks = get_masks(board_size)
+        self.color = [0] * self.num_cells
+        self.stone_masks = [0, 0, 0]  # indexed by colour, entry 0 unused
+        self.stones = ChainStones(self)
+
+    def empty(self):
+        return self.masks.full ^ (self.stone_masks[1] | self.stone_masks[2])
+
+    def dilate(self, mask):
+        """`mask` plus all the cells next to it."""
+        m = self.masks
+        return (mask
+                | ((mask & m.not_z_last) << 1) | ((mask & m.not_z_first) >> 1)
+                | ((mask & m.not_y_last) << m.row) | ((mask & m.not_y_first) >> m.row)
+                | ((mask << m.layer) & m.full) | (mask >> m.layer))
+
+    def flood(self, seed, within):
+        """The connected part of `within` that contains the cells of `seed`."""
+        chain = seed
+        while True:
+            grown = self.dilate(chain) & within
+            if grown == chain:
+                return chain
+            chain = grown
+
+    def chain_mask(self, i):
+        return self.flood(1 << i, self.stone_masks[self.color[i]])
+
+    def liberty_mask(self, chain):
+        return self.dilate(chain) & self.empty()
+
+    def find(self, i):
+        """Lowest cell of the chain containing cell i, its identity in this backend."""
+        if self.color[i] == 0:
+            return i
+        chain = self.chain_mask(i)
+        return (chain & -chain).bit_length() - 1
+
+    def chain(self, i):
+        if self.color[i] == 0:
+            return set()
+        return set(bits(self.chain_mask(i)))
+
+    def liberty_count(self, i):
+        if self.color[i] == 0:
+            return 0
+        return self.liberty_mask(self.chain_mask(i)).bit_count()
+
+    def liberty_counts(self):
+        counts = np.zeros(self.num_cells, dtype=np.int32)
+        empty = self.empty()
+        for color in (1, 2):
+            remaining = self.stone_masks[color]
+            while remaining:
+                chain = self.flood(remaining & -remaining, self.stone_masks[color])
+                remaining &= ~chain
+                counts[to_flags(chain, self.num_cells)] = (self.dilate(chain) & empty).bit_count()
+        return counts
+
+    def adjacent_chains(self, i, color):
+        """Bitboards of the distinct chains of `color` next to cell i."""
+        stones = self.stone_masks[color]
+        around = self.dilate(1 << i) & stones
+        chains = []
+        while around:
+            chain = self.flood(around & -around, stones)
+            around &= ~chain
+            chains.append(chain)
+        return chains
+
+    def captures(self, i, color):
+        """Roots of the opponent chains that a stone of `color` on empty cell i would capture."""
+        bit = 1 << i
+        empty = self.empty()
+        return [(chain & -chain).bit_length() - 1 for chain in self.adjacent_chains(i, 3 - color)
+                if self.dilate(chain) & empty == bit]
+
+    def is_suicide(self, i, color):
+        """True if a stone of `color` on empty cell i would have no liberty and capture nothing."""
+        bit = 1 << i
+        empty_after = self.empty() ^ bit
+        if self.dilate(bit) & empty_after:
+            return False
+        own = self.flood(bit, self.stone_masks[color] | bit)
+        if self.dilate(own) & empty_after:
+            return False
+        return not self.captures(i, color)
+
+    def place(self, i, color):
+        """Put a stone on empty cell i; chains merge implicitly."""
+        self.color[i] = color
+        self.stone_masks[color] |= 1 << i
+        return i
+
+    def dead_chains(self, i, color):
+        """Roots of chains of `color` adjacent to cell i that have no liberties left."""
+        empty = self.empty()
+        return [(chain & -chain).bit_length() - 1 for chain in self.adjacent_chains(i, color)
+                if not self.dilate(chain) & empty]
+
+    def remove_chain(self, root):
+        color = self.color[root]
+        chain = self.chain_mask(root)
+        self.stone_masks[color] &= ~chain
+        stones = set(bits(chain))
+        for s in stones:
+            self.color[s] = 0
+        return stones
+
+    def load(self, flat_board):
+        cells = np.asarray(flat_board, dtype=np.int8).reshape(-1)
+        self.color = cells.tolist()
+        self.stone_masks = [0, to_mask(cells == 1), to_mask(cells == 2)]
+
+
+class ChainStones:
+    """Read-only `stones[root]` lookup of BitboardGroups, matching GroupTracker.stones."""
+
+    def __init__(self, groups):
+        self.groups = groups
+
+    def __getitem__(self, root):
+        return self.groups.chain(root)
@@ -1,5 +1,91 @@
-import plotly.graph_objects as go
-from IPython import display
+import functools
+import shutil
+import sys
+from collections import namedtuple
+import numpy as np
+
+# plotly and IPython are only imported once a 3D figure is drawn, the text view and
+# headless code never pay for them
+
+Lattice = namedtuple('Lattice', ['line_x', 'line_y', 'line_z', 'node_x', 'node_y', 'node_z', 'labels'])
+
+
+@functools.lru_cache(maxsize=None)
+def lattice_geometry(board_size):
+    """
+    Static geometry of the 3D view, built once per board size.
+
+    The lattice edges are joined into single coordinate lists with None between segments so
+    they draw as one lines trace. Node coordinates and labels ('A1-1', ...) are arrays in
+    flat cell order, ready to be masked by the stones on the board.
+    """
+    line_x, line_y, line_z = [], [], []
+    for x in range(board_size):
+        for y in range(board_size):
+            for z in range(board_size):
+                if x < board_size - 1:
+                    line_x += [x, x + 1, None]
+                    line_y += [y, y, None]
+                    line_z += [z, z, None]
+                if y < board_size - 1:
+                    line_x += [x, x, None]
+                    line_y += [y, y + 1, None]
+                    line_z += [z, z, None]
+                if z < board_size - 1:
+                    line_x += [x, x, None]
+                    line_y += [y, y, None]
+                    line_z += [z, z + 1, None]
+
+    node_x, node_y, node_z = (axis.reshape(-1) for axis in np.indices((board_size,) * 3))
+    labels = np.array([f"{chr(65 + x)}{y + 1}-{z + 1}" for x, y, z in zip(node_x, node_y, node_z)])
+    return Lattice(tuple(line_x), tuple(line_y), tuple(line_z), node_x, node_y, node_z, labels)
+
+
+# Characters for empty, black and white cells, indexed by the cell value
+CELL_CHARS = np.array(['.', 'B', 'W'])
+
+# Gap between two layers printed side by side
+LAYER_GAP = 4
+
+
+def render_layers(cells, board_size, layers=None, last_index=None, width=None):
+    """
+    Text frame of the given layers (all by default), placed side by side and wrapped to `width` columns.
+
+    Cells are mapped to characters through CELL_CHARS in one array lookup and every row is read
+    out of the character grid as a single string. The cell at flat index `last_index` is
+    bracketed, e.g. [B], to highlight the last move.
+    """
+    size = board_size
+    cells = np.asarray(cells).reshape(size, size, size).astype(np.intp)
+    layers = list(range(size)) if layers is None else list(layers)
+    width = width if width is not None else shutil.get_terminal_size().columns
+
+    # Character grid indexed [z, y, column]: the row label, then one column before and one on every cell
+    row_width = 3 + 2 * size + 1
+    grid = np.full((size, size, row_width), ' ', dtype='<U1')
+    grid[:, :, 0:2] = np.array([list(f"{y + 1:2d}") for y in range(size)])[None]
+    grid[:, :, 4:row_width:2] = CELL_CHARS[cells.transpose(2, 1, 0)]
+    if last_index is not None:
+        x, y, z = np.unravel_index(last_index, (size, size, size))
+        grid[z, y, 3 + 2 * x] = '['
+        grid[z, y, 5 + 2 * x] = ']'
+    rows = grid.view(f'<U{row_width}')[..., 0]
+
+    header = ('   ' + ''.join(f" {chr(65 + x)}" for x in range(size))).ljust(row_width)
+    gap = ' ' * LAYER_GAP
+    per_band = max(1, (width + LAYER_GAP) // (row_width + LAYER_GAP))
+
+    lines = []
+    for start in range(0, len(layers), per_band):
+        band = layers[start:start + per_band]
+        lines.append('')
+        lines.append(gap.join(f"Layer {z + 1}:".ljust(row_width) for z in band).rstrip())
+        lines.append(gap.join(header for _ in band).rstrip())
+        for y in range(size):
+            lines.append(gap.join(rows[z, y] for z in band).rstrip())
+    return '\n'.join(lines) + '\n'
+
 
 class Board:
     def __init__(self,
@@ -15,83 +101,114 @@ class Board:
                 self.board_size = board_size
                 self.display_mode_view = display_mode_view
 
+                # Persistent 3D figure and the cells it currently shows, built on the first redraw
+                self.figure = None
+                self.is_widget = False
+                self.shown = None
+                self.stones = None
+                self.text = None
+
+                # Cells of the last 2D frame, for printing only the layers that changed
+                self.printed = None
+
     def display_board(self, last_move, current_player):
         if self.display_mode_view == '2d':
-            self.plot_go_board()
+            self.plot_go_board(last_move=last_move or "", current_player=current_player)
 
-        if self.display_mode_view == '3d':
+        elif self.display_mode_view == '3d':
             self.plot_go_board_3d(last_move= last_move, current_player=current_player)
 
         else:
             print("Invalid choice. View does not exist. Choose from 2D and 3D.")
 
-    def plot_go_board(self, last_move="", current_player=None):
+    def plot_go_board(self, last_move="", current_player=None, changed_only=False, out=None):
+        """
+        Print the layers side by side as text, with the last move bracketed.
+
+        With `changed_only` only the layers that differ from the previous frame (and the layer
+        of the last move) are printed. The frame is written to `out` (stdout by default) in one
+        write.
+        """
         last_move_text = "" if last_move == "" else f"Last move: {last_move} by {current_player}"
+        cells = np.asarray(self.board).reshape(-1)
+        last_index = self.move_index(last_move)
 
-        for z in range(self.board_size):
-            print(f"\nLayer {z+1}:\n")
+        layers = None
+        if changed_only and self.printed is not None:
+            changed = (cells != self.printed).reshape(self.board_size, self.board_size, self.board_size).any(axis=(0, 1))
+            if last_index is not None:
+                changed[last_index % self.board_size] = True
+            layers = np.flatnonzero(changed).tolist()
+        self.printed = cells.copy()
 
-            # Print X-axis labels (A, B, C, ...)
-            x_axis_labels = '   ' + ' '.join([chr(65 + x) for x in range(self.board_size)])
-            print(x_axis_labels)
+        frame = render_layers(cells, self.board_size, layers=layers, last_index=last_index)
+        if last_move_text:
+            frame += f"\n{last_move_text}\n"
+        out = out if out is not None else sys.stdout
+        out.write(frame)
+        out.flush()
 
-            for y in range(self.board_size):
-                row = f"{y + 1:2d} "  # Y-axis labels (1, 2, 3, ...)
-                for x in range(self.board_size):
-                    if self.board[x, y, z] == 0:
-                        row += '. '
-                    elif self.board[x, y, z] == 1:
-                        row += 'B '
-                    elif self.board[x, y, z] == 2:
-                        row += 'W '
-                print(row)
+    def move_index(self, move_str):
+        """Flat cell index of a move like 'A1-1', or None for a pass, no move or anything malformed."""
+        try:
+            col_str, z_str = move_str.upper().split('-')
+            x, y, z = ord(col_str[0]) - ord('A'), int(col_str[1:]) - 1, int(z_str) - 1
+        except (AttributeError, ValueError, IndexError):
+            return None
+        if not all(0 <= c < self.board_size for c in (x, y, z)):
+            return None
+        return (x * self.board_size + y) * self.board_size + z
 
     def plot_go_board_3d(self, last_move="", current_player=None):
-        # Clear the previous figure
-        display.clear_output(wait=True)
-
         last_move_text = "" if last_move == "" else f"Last move: {last_move} by {current_player}"
 
-        traces = []
-
-        # Iterate through each node to draw lines, text, and stones with outlines
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                for z in range(self.board_size):
-                    node_name = f"{chr(65 + x)}{y + 1}-{z + 1}"
-
-                    # Draw stones with black outlines
-                    if self.board[x, y, z] != 0:
-                        color = 'black' if self.board[x, y, z] == 1 else 'white'
-                        traces.append(go.Scatter3d(x=[x], y=[y], z=[z], mode='markers',
-                                                   marker=dict(size=10, color=color, opacity=1.0,
-                                                               line=dict(width=2, color='black')),
-                                                   showlegend=False))
-                    else:
-                        traces.append(go.Scatter3d(x=[x], y=[y], z=[z], mode='text', text=[node_name],
-                                                   textfont=dict(color='black', size=10),
-                                                   showlegend=False))
-
-                    # Draw lines to adjacent nodes
-                    if x < self.board_size - 1:
-                        traces.append(go.Scatter3d(x=[x, x + 1], y=[y, y], z=[z, z],
-                                                   mode='lines', line=dict(color='black', width=1),
-                                                   showlegend=False))
-                    if y < self.board_size - 1:
-                        traces.append(go.Scatter3d(x=[x, x], y=[y, y + 1], z=[z, z],
-                                                   mode='lines', line=dict(color='black', width=1),
-                                                   showlegend=False))
-                    if z < self.board_size - 1:
-                        traces.append(go.Scatter3d(x=[x, x], y=[y, y], z=[z, z + 1],
-                                                   mode='lines', line=dict(color='black', width=1),
-                                                   showlegend=False))
+        if self.figure is None:
+            self.build_figure()
+            self.update_figure(last_move_text)
+            self.show_figure()
+            return
+
+        self.update_figure(last_move_text)
+        # A FigureWidget redraws itself when patched, a plain figure has to be shown again
+        if not self.is_widget:
+            self.show_figure()
+
+    def build_figure(self):
+        """Create the persistent figure: the lattice, one stone trace per colour and the node labels."""
+        import plotly.graph_objects as go
+        lattice = lattice_geometry(self.board_size)
+
+        # A constant number of traces: the lattice, one per stone colour and the empty-node labels
+        traces = [go.Scatter3d(x=lattice.line_x, y=lattice.line_y, z=lattice.line_z,
+                               mode='lines', line=dict(color='black', width=1),
+                               hoverinfo='skip', showlegend=False)]
+
+        # Draw stones with black outlines
+        for color in ('black', 'white'):
+            traces.append(go.Scatter3d(x=[], y=[], z=[], mode='markers',
+                                       marker=dict(size=10, color=color, opacity=1.0,
+                                                   line=dict(width=2, color='black')),
+                                       showlegend=False))
+
+        # Every node keeps its label slot, occupied nodes just get an empty string
+        traces.append(go.Scatter3d(x=lattice.node_x, y=lattice.node_y, z=lattice.node_z,
+                                   mode='text', text=lattice.labels,
+                                   textfont=dict(color='black', size=10),
+                                   showlegend=False))
 
         # Adjust the layout to make the figure vertically larger
         layout = go.Layout(scene=dict(xaxis=dict(visible=False), yaxis=dict(visible=False), zaxis=dict(visible=False),
                                       aspectmode='cube', camera=dict(eye=dict(x=1.5, y=1.5, z=1.5))),
                            margin=dict(l=0, r=0, b=0, t=0), showlegend=False)
 
-        fig = go.Figure(data=traces, layout=layout)
+        # A FigureWidget can be patched in place (plotly 6+ needs anywidget for it); without it
+        # fall back to a figure that is re-shown
+        try:
+            fig = go.FigureWidget(data=traces, layout=layout)
+            self.is_widget = True
+        except ImportError:
+            fig = go.Figure(data=traces, layout=layout)
+            self.is_widget = False
 
         # Isometric view settings
         camera = dict(
@@ -110,7 +227,7 @@ class Board:
             ),
             annotations=[
                 dict(
-                    text=last_move_text,
+                    text="",
                     showarrow=False,
                     xref="paper",
                     yref="paper",
@@ -121,7 +238,48 @@ class Board:
                     font=dict(size=14, color='black')
                 )
             ],
-            margin=dict(b=100)
+            margin=dict(b=100),
+            # Keep the user's camera when the traces are patched
+            uirevision='board'
         )
 
-        fig.show()
+        self.figure = fig
+        self.shown = np.zeros(lattice.labels.shape, dtype=np.int8)
+        self.stones = {1: {}, 2: {}}
+        self.text = lattice.labels.copy()
+
+    def update_figure(self, last_move_text):
+        """Patch the stone traces and labels for the cells that changed since the last redraw."""
+        lattice = lattice_geometry(self.board_size)
+        cells = np.asarray(self.board).reshape(-1)
+        changed = np.flatnonzero(cells != self.shown)
+
+        # Only the changed cells are touched; the stone dicts keep each colour's cells in placement order
+        touched = set()
+        for i in changed.tolist():
+            old, new = int(self.shown[i]), int(cells[i])
+            if old:
+                del self.stones[old][i]
+            if new:
+                self.stones[new][i] = None
+            self.text[i] = "" if new else lattice.labels[i]
+            touched.update((old, new))
+        self.shown[changed] = cells[changed]
+
+        with self.figure.batch_update():
+            for player_id in touched & {1, 2}:
+                trace = self.figure.data[player_id]
+                index = list(self.stones[player_id])
+                trace.x, trace.y, trace.z = lattice.node_x[index], lattice.node_y[index], lattice.node_z[index]
+            if changed.size:
+                self.figure.data[3].text = self.text
+            self.figure.layout.annotations[0].text = last_move_text
+
+    def show_figure(self):
+        from IPython import display
+        # Clear the previous figure
+        display.clear_output(wait=True)
+        if self.is_widget:
+            display.display(self.figure)
+        else:
+            self.figure.show()
@@ -0,0 +1,59 @@
+import functools
+import numpy as np
+
+# The six axis directions of the cubic lattice
+DIRECTIONS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+
+class BoardGeometry:
+    """
+    Static geometry of a board_size**3 cube.
+
+    Cells are stored as a flat index x * size**2 + y * size + z, the C-order layout of a
+    (size, size, size) array, so `cells.reshape(size, size, size)[x, y, z]` and `cells[i]`
+    address the same point. Neighbours are kept in CSR form: the on-board neighbours of
+    cell i are `indices[indptr[i]:indptr[i + 1]]`. Off-board neighbours are never stored,
+    so rules code does not need any bounds test.
+
+    `neighbor_matrix` is the same table padded to shape (num_cells, 6) with the sentinel
+    index num_cells, for vectorised code that gathers from an array with one extra slot.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.num_cells = board_size ** 3
+
+        neighbors = []
+        for i in range(self.num_cells):
+            x, y, z = self.coords(i)
+            row = []
+            for dx, dy, dz in DIRECTIONS:
+                nx, ny, nz = x + dx, y + dy, z + dz
+                if 0 <= nx < board_size and 0 <= ny < board_size and 0 <= nz < board_size:
+                    row.append(self.index(nx, ny, nz))
+            neighbors.append(tuple(row))
+
+        # Python tuples for scalar loops, CSR arrays for vectorised code
+        self.neighbors = tuple(neighbors)
+        self.indptr = np.zeros(self.num_cells + 1, dtype=np.int32)
+        self.indptr[1:] = np.cumsum([len(row) for row in neighbors])
+        self.indices = np.fromiter((n for row in neighbors for n in row), dtype=np.int32, count=int(self.indptr[-1]))
+        self.neighbor_matrix = np.full((self.num_cells, len(DIRECTIONS)), self.num_cells, dtype=np.int32)
+        for i, row in enumerate(neighbors):
+            self.neighbor_matrix[i, :len(row)] = row
+
+    def index(self, x, y, z):
+        return (x * self.board_size + y) * self.board_size + z
+
+    def coords(self, i):
+        size = self.board_size
+        return i // (size * size), (i // size) % size, i % size
+
+    def on_board(self, x, y, z):
+        return 0 <= x < self.board_size and 0 <= y < self.board_size and 0 <= z < self.board_size
+
+
+@functools.lru_cache(maxsize=None)
+def get_geometry(board_size) -> BoardGeometry:
+    """Return the shared geometry for a board size, building it on first use."""
+    return BoardGeometry(board_size)
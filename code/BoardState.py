@@ -0,0 +1,217 @@
+from collections import Counter
+import numpy as np
+import Bitboard as bitboard
+import BoardGeometry as geometry
+import GroupTracker as groups
+import Zobrist as zobrist
+
+# Chain structures behind BoardState, chosen with its `backend` argument
+BACKENDS = {
+    'unionfind': groups.GroupTracker,
+    'bitboard': bitboard.BitboardGroups,
+}
+
+# Unwinding more entries than this in restore() rebuilds the chains from scratch instead
+RESTORE_REBUILD_THRESHOLD = 16
+
+
+class BoardState:
+    """
+    Compact board position with an undo log.
+
+    Stones live in a flat int8 buffer (0 empty, 1 black, 2 white) laid out as described in
+    BoardGeometry; `board` is a (size, size, size) view of the same memory. Every placed
+    stone appends an entry [index, color, removed, hash before] to the undo log, where
+    `removed` lists the opponent stones it captured. `snapshot()` is just the current log
+    length and `restore()` unwinds the log back to it, so search and replay can make and
+    unmake moves without copying the board.
+
+    `hash` is the Zobrist hash of the position, updated on every placement and removal, and
+    `positions` counts the hashes of all positions reached so far for the superko rule. The
+    same hashes are kept in order in the uint64 array `history[:history_length]`, which the
+    vectorised superko test checks against without building anything per call; use
+    `add_positions` to bring in positions reached elsewhere so the two stay in step.
+
+    `backend` picks the chain structure: 'unionfind' (GroupTracker, incremental) or
+    'bitboard' (BitboardGroups, one int bitset per colour).
+    """
+
+    def __init__(self, board_size, backend='unionfind'):
+        self.board_size = board_size
+        self.geometry = geometry.get_geometry(board_size)
+        self.cells = np.zeros(self.geometry.num_cells, dtype=np.int8)
+        self.board = self.cells.reshape((board_size, board_size, board_size))
+        self.groups = BACKENDS[backend](board_size)
+        self.undo_log = []
+
+        self.keys = zobrist.get_keys(board_size).tolist()
+        self.hash = 0
+        self.positions = Counter({0: 1})
+        self.history = np.zeros(64, dtype=np.uint64)
+        self.history_length = 1
+
+    def place(self, i, color):
+        """Put a stone of `color` on empty cell i without resolving captures."""
+        self.cells[i] = color
+        self.groups.place(i, color)
+        self.undo_log.append([i, color, [], self.hash])
+        self.hash ^= self.keys[color][i]
+
+    def capture(self, i, color):
+        """Remove the chains of `color` next to cell i that have no liberties left.
+
+        Returns one set of cells per removed chain. The stones are recorded against the
+        last placement so that `undo()` can put them back, and the resulting position is
+        added to `positions`.
+        """
+        removed_chains = []
+        removed = self.undo_log[-1][2]
+        keys = self.keys[color]
+        for root in self.groups.dead_chains(i, color):
+            stones = self.groups.remove_chain(root)
+            self.cells[list(stones)] = 0
+            for s in stones:
+                self.hash ^= keys[s]
+            removed.extend(stones)
+            removed_chains.append(stones)
+        self.record_position(self.hash)
+        return removed_chains
+
+    def record_position(self, key):
+        self.positions[key] += 1
+        if self.history_length == len(self.history):
+            self.history = np.concatenate((self.history, np.zeros_like(self.history)))
+        self.history[self.history_length] = key
+        self.history_length += 1
+
+    def add_positions(self, keys):
+        """Count earlier positions (hashes), e.g. the game history of the position that was loaded."""
+        for key in keys:
+            self.record_position(key)
+
+    def play(self, i, color):
+        """Place a stone and resolve captures, returning the list of removed cells."""
+        self.place(i, color)
+        self.capture(i, 3 - color)
+        return self.undo_log[-1][2]
+
+    def hash_after(self, i, color):
+        """Hash of the position after a stone of `color` is played on empty cell i."""
+        new_hash = self.hash ^ self.keys[color][i]
+        keys = self.keys[3 - color]
+        for root in self.groups.captures(i, color):
+            for s in self.groups.stones[root]:
+                new_hash ^= keys[s]
+        return new_hash
+
+    def repeats_position(self, i, color):
+        """Positional superko: True if the move would recreate any earlier position."""
+        return self.hash_after(i, color) in self.positions
+
+    def legal_moves(self, color, liberties=None):
+        """
+        Bool mask of the cells where `color` may play, superko included.
+
+        Built for all cells at once from the colours and chain liberty counts around each
+        empty cell, see playable_moves and superko_moves. `liberties` may pass in
+        groups.liberty_counts() if the caller already has it.
+        """
+        playable, captures = self.playable_moves(color, liberties)
+        return playable & ~self.superko_moves(color, playable, captures)
+
+    def playable_moves(self, color, liberties=None):
+        """
+        (playable, captures) bool masks ignoring superko: a move is playable if it touches an
+        empty cell, a friendly chain with more than one liberty or an opponent chain in atari,
+        and `captures` marks the cells next to an opponent chain in atari.
+        """
+        neighbors = self.geometry.neighbor_matrix
+        colors = np.append(self.cells, -1)
+        liberties = np.append(liberties if liberties is not None else self.groups.liberty_counts(), 0)
+        neighbor_colors = colors[neighbors]
+        neighbor_liberties = liberties[neighbors]
+
+        captures = ((neighbor_colors == 3 - color) & (neighbor_liberties == 1)).any(axis=1)
+        playable = (self.cells == 0) & ((neighbor_colors == 0).any(axis=1)
+                                        | ((neighbor_colors == color) & (neighbor_liberties > 1)).any(axis=1)
+                                        | captures)
+        return playable, captures
+
+    def superko_moves(self, color, candidates, captures):
+        """
+        Bool mask of the `candidates` that would recreate an earlier position.
+
+        Moves that capture nothing can only repeat a position through their own key, so
+        their hashes are looked up at once in the sorted history; the few capturing moves go
+        through hash_after.
+        """
+        seen = np.sort(self.history[:self.history_length])
+        quiet = np.flatnonzero(candidates & ~captures)
+        hashes = np.uint64(self.hash) ^ zobrist.get_keys(self.board_size)[color, quiet]
+        found = np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)
+        repeats = np.zeros(len(candidates), dtype=bool)
+        repeats[quiet[seen[found] == hashes]] = True
+        for i in np.flatnonzero(candidates & captures).tolist():
+            if self.hash_after(i, color) in self.positions:
+                repeats[i] = True
+        return repeats
+
+    def undo(self):
+        """Take back the last placement, restoring any stones it captured."""
+        i, color, removed = self._unwind()
+        tracker = self.groups
+
+        # Dissolve the chain the stone joined and rebuild it without that stone
+        chain = tracker.remove_chain(tracker.find(i))
+        for s in chain:
+            if s != i:
+                tracker.place(s, color)
+
+        opponent = 3 - color
+        for s in removed:
+            tracker.place(s, opponent)
+        return i, color, removed
+
+    def snapshot(self):
+        """Return a marker for the current position, valid while the log is not unwound past it."""
+        return len(self.undo_log)
+
+    def restore(self, marker):
+        """Unwind the log back to `marker`.
+
+        A long unwind (a finished playout, say) only reverts the cells and hashes entry by
+        entry and rebuilds the chains once at the end, which is cheaper than undoing every
+        merge one at a time.
+        """
+        if len(self.undo_log) - marker <= RESTORE_REBUILD_THRESHOLD:
+            while len(self.undo_log) > marker:
+                self.undo()
+            return
+        while len(self.undo_log) > marker:
+            self._unwind()
+        self.groups.load(self.cells.tolist())
+
+    def _unwind(self):
+        """Pop the last log entry and revert the cells and hashes it changed, but not the chains."""
+        i, color, removed, previous_hash = self.undo_log.pop()
+
+        self.positions[self.hash] -= 1
+        if not self.positions[self.hash]:
+            del self.positions[self.hash]
+        self.history_length -= 1
+        self.hash = previous_hash
+
+        self.cells[i] = 0
+        if removed:
+            self.cells[removed] = 3 - color
+        return i, color, removed
+
+    def load(self, board):
+        """Replace the position with the stones of `board` (any array of size**3 cells) and clear the log."""
+        self.cells[:] = np.asarray(board, dtype=np.int8).reshape(-1)
+        self.groups.load(self.cells.tolist())
+        self.undo_log = []
+        self.hash = zobrist.hash_cells(self.cells, zobrist.get_keys(self.board_size))
+        self.positions = Counter({self.hash: 1})
+        self.history[0] = self.hash
+        self.history_length = 1
@@ -1,20 +1,46 @@
 import re, time
-from openai import OpenAI
 import os
-ASSISTANT_API = os.environ['ASSISTANT_API']
-client = OpenAI()
+import numpy as np
+import GameRecord as records
+import OpeningBook as opening_book
+import PromptPayload as prompt
+
+_client = None
+
+
+def get_client():
+    """The OpenAI client, created (and openai imported) on first use rather than at import."""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI()
+    return _client
+
 
 class ComputerGPTPlayer():
     def __init__(self,
                  mode: str,
                  board_size: int,
                  gpt_stone_color: str,
-                 assistant_id = ASSISTANT_API):
-        self.assistant_id = assistant_id
-        self.thread = client.beta.threads.create()
+                 assistant_id = None,
+                 payload_mode = 'delta',
+                 book = None):
+        # Read when a game against the assistant starts, so importing this module never needs it
+        self.assistant_id = assistant_id if assistant_id is not None else os.environ['ASSISTANT_API']
+        self.thread = get_client().beta.threads.create()
         self.mode = mode
         self.board_size = board_size
         self.gpt_stone_color = gpt_stone_color
+        # 'delta' only sends what changed since the previous turn, the thread keeps the rest
+        self.prompt = prompt.PromptEncoder(board_size, payload_mode)
+        # Set by Instrumentation.Profiler.instrument_player to count round-trips, polls and sleeps
+        self.profiler = None
+        # Optional OpeningBook (or its path): early positions it knows are answered without a
+        # remote call, and accepted remote answers are added to it
+        self.book = opening_book.open_book(book)
+        self.player_id = 1 if gpt_stone_color == "black" else 2
+        self.book_tried = None     # position the last book answer was given for
+        self.pending = None        # (cells, move) of the last remote answer, recorded once it is on the board
 
     def extract_assistant_move_str(self, input_str) -> str:
         """
@@ -74,42 +100,91 @@ class ComputerGPTPlayer():
 
     def run_status(self, run):
         # Waits for the run to be completed.
+        client = get_client()
         while True:
             run_status = client.beta.threads.runs.retrieve(thread_id=self.thread.id,
                                                            run_id=run.id)
             print(run_status.status)
+            if self.profiler is not None:
+                self.profiler.count('remote_polls')
             if run_status.status == "completed":
                 break
             elif run_status.status == "failed":
                 print("Run failed:", run_status.last_error)
                 break
+            elif run_status.status in ("cancelled", "expired", "incomplete", "requires_action"):
+                break
+            if self.profiler is not None:
+                self.profiler.count('remote_sleep_s', 2)
             time.sleep(2)  # wait for 2 seconds before checking again
 
+    def book_play(self, cells):
+        """Move string from the opening book for `cells`, or None to ask the assistant."""
+        if self.pending is not None:
+            # The previous remote answer was accepted if our stone is now on its cell
+            answered, move = self.pending
+            if cells[move] == self.player_id:
+                self.book.add(answered, self.player_id, {move: (1, 0.5)})
+            self.pending = None
+        # An answer the engine rejected is asked again for the same position, go remote then
+        if not self.book.covers(cells) or cells.tobytes() == self.book_tried:
+            return None
+        move = self.book.lookup(cells, self.player_id, legal=cells == 0)
+        if move is None:
+            return None
+        self.book_tried = cells.tobytes()
+        return records.move_to_str(move, self.board_size)
+
+    def remember_answer(self, cells, gpt_move_str):
+        """Keep an early remote answer to add to the book once the engine has played it."""
+        if not gpt_move_str or '-' not in gpt_move_str or not self.book.covers(cells):
+            return
+        try:
+            move = records.move_from_str(gpt_move_str, self.board_size)
+        except (ValueError, IndexError):
+            return
+        # Off-board coordinates still give an index, only keep answers that name a real cell
+        if 0 <= move < len(cells) and records.move_to_str(move, self.board_size) == gpt_move_str.upper():
+            self.pending = (cells, move)
+
     def get_play(self, move_str, board, board_history, captured_stones) -> str:
 
-        oponent_move_msg = f"The oponent made {move_str}. "
-        captured_stone_msg = f"The move caused stones to be captured: {captured_stones}" if not captured_stones.black or captured_stones.white else ""
-        board_status_msg = f"The current board looks like this: {board}. "
-        move_history = f"This is the history of moves, that has led to the current board status: {board_history}."
+        if self.book is not None:
+            cells = np.asarray(board).reshape(-1).astype(np.int8)
+            book_move_str = self.book_play(cells)
+            if book_move_str is not None:
+                if self.profiler is not None:
+                    self.profiler.count('book_hits')
+                # The assistant never saw this move, the next message has to carry the whole board
+                self.prompt.forget()
+                return book_move_str
 
-        message_payload = ''.join([oponent_move_msg,captured_stone_msg, board_status_msg, move_history])
+        message_payload = self.prompt.payload(move_str, board, board_history, captured_stones)
 
         print(message_payload)
 
+        if self.profiler is not None:
+            self.profiler.count('remote_sleep_s', 5)
+            self.profiler.count('remote_round_trips')
         time.sleep(5)
 
+        client = get_client()
         message = client.beta.threads.messages.create(thread_id=self.thread.id,
                                                       role="user",
                                                       content=message_payload)
 
         run = client.beta.threads.runs.create(thread_id=self.thread.id,
                                               assistant_id=self.assistant_id,
-                                             instructions=f'You are playing in {self.mode} mode as {self.gpt_stone_color} stone colors a {self.board_size}x{self.board_size}x{self.board_size} Go Game. You always respond with "move_str: MYMOVE", where MYMOVE is your move.')
+                                             instructions=f'You are playing in {self.mode} mode as {self.gpt_stone_color} stone colors a {self.board_size}x{self.board_size}x{self.board_size} Go Game. You always respond with "move_str: MYMOVE", where MYMOVE is your move. {prompt.INSTRUCTIONS}')
 
         self.run_status(run)
 
         messages = client.beta.threads.messages.list(thread_id=self.thread.id)
 
         gpt_move_str = self.get_assistant_message(messages)
+        self.prompt.answered(gpt_move_str)
+
+        if self.book is not None:
+            self.remember_answer(cells, gpt_move_str)
 
         return gpt_move_str
@@ -0,0 +1,126 @@
+"""
+Input planes for training position evaluators.
+
+Positions are written as int8 0/1 planes into a caller-owned (N, C, S, S, S) array, one row
+per position, seen from the side to move:
+
+    own stones, opponent stones, empty cells,
+    own chains with 1, 2, ..., `liberty_buckets` or more liberties (one plane each),
+    opponent chains likewise,
+    the last `history` moves, most recent first (one plane each, empty for a pass),
+    superko points: empty cells the side to move may not play because of a repeat.
+
+The planes of a row are computed into a scratch buffer owned by the extractor and then
+gathered into the output through one of the 48 cube symmetries (the identity by default),
+so augmentation costs nothing extra and no per-position arrays are kept.
+"""
+import numpy as np
+import GameRecord as records
+import Replay as replay
+import Symmetry as symmetry
+
+
+class FeatureExtractor:
+
+    def __init__(self, board_size, history=4, liberty_buckets=4):
+        self.board_size = board_size
+        self.num_cells = board_size ** 3
+        self.history = history
+        self.liberty_buckets = liberty_buckets
+        self.symmetries = symmetry.get_symmetries(board_size)
+
+        # Plane offsets
+        self.own_liberties = 3
+        self.opponent_liberties = self.own_liberties + liberty_buckets
+        self.recent = self.opponent_liberties + liberty_buckets
+        self.superko = self.recent + history
+        self.num_planes = self.superko + 1
+
+        self.scratch = np.zeros((self.num_planes, self.num_cells), dtype=np.int8)
+        self.buckets = np.arange(1, liberty_buckets + 1, dtype=np.int32)[:, None]
+
+    def allocate(self, count, path=None):
+        """
+        Zeroed (count, C, S, S, S) int8 output array; with `path` it is a .npy file opened as a
+        writable memory map, which np.load(path, mmap_mode='r') reads back without copying.
+        """
+        shape = (count, self.num_planes) + (self.board_size,) * 3
+        if path is None:
+            return np.zeros(shape, dtype=np.int8)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=shape)
+
+    def write(self, out, row, cells, color, liberties, recent_moves=(), superko=None, symmetry=0):
+        """
+        Write one position into out[row].
+
+        `cells` are the flat colours, `color` the side to move (1 black, 2 white),
+        `liberties` the liberty count of the chain on every cell (GroupTracker.liberty_counts),
+        `recent_moves` the last moves as flat indices, most recent first (negative for a pass)
+        and `superko` an optional bool mask of superko points.
+        """
+        planes = self.scratch
+        planes[:] = 0
+        bools = planes.view(bool)
+        own, opponent = bools[0], bools[1]
+        np.equal(cells, color, out=own)
+        np.equal(cells, 3 - color, out=opponent)
+        np.equal(cells, 0, out=bools[2])
+
+        # Liberty counts of 1 .. buckets - 1 get their own plane, the last bucket takes the rest
+        clipped = np.minimum(liberties, self.liberty_buckets)
+        in_bucket = clipped == self.buckets
+        np.logical_and(in_bucket, own, out=bools[self.own_liberties:self.opponent_liberties])
+        np.logical_and(in_bucket, opponent, out=bools[self.opponent_liberties:self.recent])
+
+        for k, move in enumerate(recent_moves[:self.history]):
+            if move >= 0:
+                planes[self.recent + k, move] = 1
+        if superko is not None:
+            bools[self.superko] = superko
+
+        target = out[row].reshape(self.num_planes, self.num_cells)
+        np.take(planes, self.symmetries.permutations[symmetry], axis=1, out=target)
+
+    def write_state(self, out, row, board_state, color, recent_moves=(), symmetry=0):
+        """Write a live BoardState position (e.g. RulesEngine.state), superko points included."""
+        liberties = board_state.groups.liberty_counts()
+        playable, captures = board_state.playable_moves(color, liberties)
+        superko = board_state.superko_moves(color, playable, captures)
+        self.write(out, row, board_state.cells, color, liberties, recent_moves, superko, symmetry)
+
+    def write_game(self, out, row, moves, board_size=None, plies=None, symmetries=None, rng=None):
+        """
+        Replay a game (flat moves with PASS/RESIGN) and write its positions from row `row` on.
+
+        `plies` picks which positions to write (all by default). `symmetries` gives one
+        symmetry per written position, or 'random' to draw them from `rng`. Returns the next
+        free row.
+        """
+        board_size = board_size if board_size is not None else self.board_size
+        moves = np.asarray(moves)
+        wanted = None if plies is None else set(int(p) for p in plies)
+        count = len(moves) + 1 if plies is None else len(wanted)
+        if isinstance(symmetries, str):
+            rng = rng if rng is not None else np.random.default_rng()
+            symmetries = rng.integers(len(self.symmetries.permutations), size=count)
+
+        written = 0
+        for ply, board_state in replay.replay_states(moves, board_size):
+            if wanted is not None and ply not in wanted:
+                continue
+            if ply > 0 and moves[ply - 1] == records.RESIGN:
+                break  # same position as the one before the resignation
+            color = 1 if ply % 2 == 0 else 2
+            recent = moves[max(0, ply - self.history):ply][::-1]
+            k = symmetries[written] if symmetries is not None else 0
+            self.write_state(out, row + written, board_state, color, recent, k)
+            written += 1
+        return row + written
+
+    def transform(self, planes, k, out=None):
+        """Planes of one position, (C, S, S, S), under symmetry k."""
+        flat = np.asarray(planes).reshape(self.num_planes, self.num_cells)
+        if out is None:
+            out = np.empty_like(planes)
+        np.take(flat, self.symmetries.permutations[k], axis=1, out=out.reshape(self.num_planes, self.num_cells))
+        return out
@@ -0,0 +1,273 @@
+"""
+Compact binary game records.
+
+A record file starts with the MAGIC bytes and then holds one game after another. Each game
+is a varint byte length followed by its body:
+
+    board size             1 byte
+    black, white           varint length + UTF-8 name each
+    result                 1 byte (see RESULT_CODES)
+    black, white score     varint each
+    move count             varint
+    moves                  one varint per move
+
+A move is stored as its flat cell index + 2, code 1 is a pass and code 0 a resignation, so
+on a 5x5x5 board every move fits in one byte. In memory the moves are an int32 array of
+flat indices with PASS (-1) and RESIGN (-2).
+
+The writer only ever appends. Next to every record file it keeps an index file
+('<path>.idx') of little-endian uint64 game offsets, which the reader memory-maps to jump
+straight to game N.
+"""
+import collections
+import os
+import numpy as np
+
+MAGIC = b'G3DR\x01'
+
+PASS = -1
+RESIGN = -2
+
+# Offset between a move (flat index, PASS or RESIGN) and its stored code
+MOVE_OFFSET = 2
+
+RESULT_CODES = {None: 0, 'black': 1, 'white': 2, 'tie': 3}
+RESULTS = {code: result for result, code in RESULT_CODES.items()}
+
+INDEX_SUFFIX = '.idx'
+
+GameRecord = collections.namedtuple('GameRecord', ['board_size', 'black', 'white', 'winner', 'scores', 'moves'])
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, pos):
+    """Read one varint from `data` at `pos`; returns (value, next position)."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_moves(moves):
+    """Varint bytes of a sequence of moves (flat indices, PASS or RESIGN)."""
+    out = bytearray()
+    for move in moves:
+        encode_varint(int(move) + MOVE_OFFSET, out)
+    return bytes(out)
+
+
+def decode_moves(data):
+    """int32 array of the moves in a run of move varints, decoded all at once."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not raw.size:
+        return np.zeros(0, dtype=np.int32)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # Shift every byte by 7 bits per position inside its own varint and add the groups up
+    position = np.arange(raw.size) - np.repeat(starts, ends - starts + 1)
+    values = (raw & 0x7F).astype(np.int64) << (7 * position)
+    return (np.add.reduceat(values, starts) - MOVE_OFFSET).astype(np.int32)
+
+
+def move_from_str(move_str, board_size):
+    """Flat index of a move string like 'A1-1'; 'p' is PASS and 'f' (forfeit) RESIGN."""
+    move_str = move_str.lower()
+    if move_str == 'p':
+        return PASS
+    if move_str == 'f':
+        return RESIGN
+    col_str, z_str = move_str.upper().split('-')
+    x, y, z = ord(col_str[0]) - ord('A'), int(col_str[1:]) - 1, int(z_str) - 1
+    return (x * board_size + y) * board_size + z
+
+
+def move_to_str(move, board_size):
+    if move == PASS:
+        return 'p'
+    if move == RESIGN:
+        return 'f'
+    x, rest = divmod(int(move), board_size * board_size)
+    y, z = divmod(rest, board_size)
+    return f"{chr(65 + x)}{y + 1}-{z + 1}"
+
+
+def encode_game(record):
+    body = bytearray([record.board_size])
+    for name in (record.black, record.white):
+        name = (name or '').encode('utf-8')
+        encode_varint(len(name), body)
+        body += name
+    body.append(RESULT_CODES[record.winner])
+    black_score, white_score = record.scores if record.scores is not None else (0, 0)
+    encode_varint(int(black_score), body)
+    encode_varint(int(white_score), body)
+    encode_varint(len(record.moves), body)
+    body += encode_moves(record.moves)
+
+    out = bytearray()
+    encode_varint(len(body), out)
+    return bytes(out + body)
+
+
+def decode_game(body):
+    """GameRecord from a game body (without its length prefix)."""
+    board_size = body[0]
+    pos = 1
+    names = []
+    for _ in range(2):
+        length, pos = decode_varint(body, pos)
+        names.append(bytes(body[pos:pos + length]).decode('utf-8'))
+        pos += length
+    winner = RESULTS[body[pos]]
+    black_score, pos = decode_varint(body, pos + 1)
+    white_score, pos = decode_varint(body, pos)
+    _, pos = decode_varint(body, pos)
+    return GameRecord(board_size, names[0], names[1], winner, (black_score, white_score), decode_moves(body[pos:]))
+
+
+def from_selfplay(record):
+    """GameRecord from a SelfPlay result dict."""
+    board_size = record['board_size']
+    moves = [move_from_str(move_str, board_size) for move_str in record['moves']]
+    scores = record['scores']
+    return GameRecord(board_size, record['black'], record['white'], record['winner'] or 'tie',
+                      (scores['black'], scores['white']), moves)
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file and its offset index.
+
+        with GameRecordWriter('games.g3d') as writer:
+            writer.write(GameRecord(5, 'random', 'mcts', 'white', (40, 85), moves))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(MAGIC)
+        elif not os.path.exists(path + INDEX_SUFFIX):
+            build_index(path)
+        self.index = open(path + INDEX_SUFFIX, 'ab')
+        self.offset = self.file.tell()
+
+    def write(self, record):
+        data = encode_game(record)
+        self.file.write(data)
+        self.index.write(np.uint64(self.offset).tobytes())
+        self.offset += len(data)
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecordReader:
+    """
+    Reads a record file.
+
+    Iterating streams the games from disk in order without loading the whole file; indexing
+    (reader[n]) seeks to game n through the memory-mapped offset index, which is rebuilt by
+    scanning the file if it is missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        self._offsets = None
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            index_path = self.path + INDEX_SUFFIX
+            if not os.path.exists(index_path):
+                build_index(self.path)
+            if os.path.getsize(index_path) == 0:
+                self._offsets = np.zeros(0, dtype='<u8')
+            else:
+                self._offsets = np.memmap(index_path, dtype='<u8', mode='r')
+        return self._offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, n):
+        return decode_game(self.read_body(int(self.offsets[n])))
+
+    def __iter__(self):
+        with open(self.path, 'rb') as stream:
+            stream.seek(len(MAGIC))
+            while True:
+                body = read_body(stream)
+                if body is None:
+                    return
+                yield decode_game(body)
+
+    def read_body(self, offset):
+        self.file.seek(offset)
+        return read_body(self.file)
+
+    def close(self):
+        self.file.close()
+        self._offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_body(stream):
+    """Read the next length-prefixed game body from a binary stream, or None at the end."""
+    length = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            return None
+        length |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            break
+        shift += 7
+    return stream.read(length)
+
+
+def build_index(path):
+    """Write the offset index of a record file by scanning it."""
+    offsets = []
+    with open(path, 'rb') as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        while True:
+            offset = stream.tell()
+            if read_body(stream) is None:
+                break
+            offsets.append(offset)
+    np.asarray(offsets, dtype='<u8').tofile(path + INDEX_SUFFIX)
+    return len(offsets)
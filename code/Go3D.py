@@ -1,8 +1,18 @@
 
+import os
 import GameController as go
 
 
 print("welcome to 3d go. the real 3-dimensional chess. v1.0 by @htarrido-picart\n")
 board_size = int(input("What board size would you like to play? (3,4,5): "))
-game = go.GameController(board_size)
+# GO3D_PROFILE=profile.json records where the time of every move goes and saves it at the end
+profile_path = os.environ.get('GO3D_PROFILE')
+profiler = None
+if profile_path:
+    import Instrumentation as instrumentation
+    profiler = instrumentation.Profiler()
+# GO3D_BOOK=book.sqlite lets the computer player answer known openings from an OpeningBook
+game = go.GameController(board_size, profiler=profiler, book=os.environ.get('GO3D_BOOK'))
 game.play_game()
+if profiler is not None:
+    profiler.to_json(profile_path)
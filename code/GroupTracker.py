@@ -0,0 +1,146 @@
+import numpy as np
+import BoardGeometry as geometry
+
+
+class GroupTracker:
+    """
+    Persistent chain structure for the rules engine.
+
+    Cells are addressed by their flat index (see BoardGeometry). Chains are kept in a
+    union-find over cells (union by size, path halving) and each chain root owns the set of
+    its stones and the set of its liberties. Both are updated incrementally when a stone is placed or a chain is
+    removed, so liberty, capture and suicide questions never need a flood fill.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.geometry = geometry.get_geometry(board_size)
+        self.num_cells = self.geometry.num_cells
+        self.neighbors = self.geometry.neighbors
+        self.index = self.geometry.index
+        self.coords = self.geometry.coords
+        self.color = [0] * self.num_cells
+        self.parent = list(range(self.num_cells))
+        self.stones = {}     # chain root -> set of stone cells
+        self.liberties = {}  # chain root -> set of empty cells adjacent to the chain
+
+    def find(self, i):
+        """Return the root of the chain containing cell i."""
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def chain(self, i):
+        """Stones of the chain containing cell i (empty set if the cell is empty)."""
+        if self.color[i] == 0:
+            return set()
+        return self.stones[self.find(i)]
+
+    def liberty_count(self, i):
+        if self.color[i] == 0:
+            return 0
+        return len(self.liberties[self.find(i)])
+
+    def liberty_counts(self):
+        """Array of the liberty count of the chain on every cell (0 for empty cells)."""
+        # Resolve every cell to its root by pointer jumping over the parent array
+        roots = np.array(self.parent, dtype=np.intp)
+        while True:
+            jumped = roots[roots]
+            if np.array_equal(jumped, roots):
+                break
+            roots = jumped
+        # Empty cells are their own roots and own no liberty set, so they stay 0
+        per_root = np.zeros(self.num_cells, dtype=np.int32)
+        count = len(self.liberties)
+        per_root[np.fromiter(self.liberties, dtype=np.intp, count=count)] = np.fromiter(
+            map(len, self.liberties.values()), dtype=np.int32, count=count)
+        return per_root[roots]
+
+    def captures(self, i, color):
+        """Roots of the opponent chains that a stone of `color` on empty cell i would capture."""
+        opponent = 3 - color
+        roots = []
+        for n in self.neighbors[i]:
+            if self.color[n] == opponent:
+                root = self.find(n)
+                if root not in roots and len(self.liberties[root]) == 1:
+                    roots.append(root)
+        return roots
+
+    def is_suicide(self, i, color):
+        """True if a stone of `color` on empty cell i would have no liberty and capture nothing."""
+        opponent = 3 - color
+        for n in self.neighbors[i]:
+            neighbor_color = self.color[n]
+            if neighbor_color == 0:
+                return False
+            libs = len(self.liberties[self.find(n)])
+            if neighbor_color == color and libs > 1:
+                return False
+            if neighbor_color == opponent and libs == 1:
+                return False
+        return True
+
+    def place(self, i, color):
+        """Put a stone on empty cell i, merging it with adjacent friendly chains."""
+        self.color[i] = color
+        self.parent[i] = i
+        self.stones[i] = {i}
+        self.liberties[i] = {n for n in self.neighbors[i] if self.color[n] == 0}
+
+        root = i
+        for n in self.neighbors[i]:
+            neighbor_color = self.color[n]
+            if neighbor_color == 0:
+                continue
+            other = self.find(n)
+            if other == root:
+                continue
+            self.liberties[other].discard(i)
+            if neighbor_color == color:
+                root = self._union(root, other)
+        return root
+
+    def dead_chains(self, i, color):
+        """Roots of chains of `color` adjacent to cell i that have no liberties left."""
+        roots = []
+        for n in self.neighbors[i]:
+            if self.color[n] == color:
+                root = self.find(n)
+                if root not in roots and not self.liberties[root]:
+                    roots.append(root)
+        return roots
+
+    def remove_chain(self, root):
+        """Take a whole chain off the board and give its cells back as liberties to its neighbours."""
+        stones = self.stones.pop(root)
+        del self.liberties[root]
+        for s in stones:
+            self.color[s] = 0
+            self.parent[s] = s
+        for s in stones:
+            for n in self.neighbors[s]:
+                if self.color[n] != 0:
+                    self.liberties[self.find(n)].add(s)
+        return stones
+
+    def load(self, flat_board):
+        """Rebuild every chain from a flat sequence of cell colours."""
+        self.color = [0] * self.num_cells
+        self.parent = list(range(self.num_cells))
+        self.stones = {}
+        self.liberties = {}
+        for i, value in enumerate(flat_board):
+            if value:
+                self.place(i, int(value))
+
+    def _union(self, a, b):
+        if len(self.stones[a]) < len(self.stones[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.stones[a] |= self.stones.pop(b)
+        self.liberties[a] |= self.liberties.pop(b)
+        return a
@@ -0,0 +1,141 @@
+"""
+Opt-in instrumentation for the game loop.
+
+A Profiler collects named counters and latency samples per stage. Nothing in the engine
+refers to it: `instrument_*` replace methods of one object with timed or counting
+wrappers on that instance only, so an uninstrumented game runs exactly the original code.
+Players that talk to a remote service look for an optional `profiler` attribute and count
+their round-trips, polls and sleeps on it.
+
+    profiler = Profiler()
+    profiler.instrument_engine(game)
+    ...
+    profiler.end_move()          # after every move or pass played
+    print(profiler.table())
+    profiler.to_json('profile.json')
+"""
+import collections
+import contextlib
+import functools
+import json
+import math
+import time
+
+
+class Profiler:
+
+    def __init__(self):
+        self.counters = collections.Counter()
+        self.timings = collections.defaultdict(list)
+        self.moves = []  # counter increments of every finished move
+        self._move_start = collections.Counter()
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def record(self, stage, seconds):
+        self.timings[stage].append(seconds)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def end_move(self):
+        """Close the current move: store how much every counter grew during it."""
+        delta = self.counters - self._move_start
+        self.moves.append(dict(delta))
+        self._move_start = self.counters.copy()
+
+    def wrap(self, obj, method, stage=None, counter=None, amount=None):
+        """
+        Replace `obj.method` on this instance with a wrapper that times it as `stage` and/or
+        adds to `counter` on every call (`amount(result)` if given, else 1).
+        """
+        original = getattr(obj, method)
+        record, count, perf_counter = self.record, self.count, time.perf_counter
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            result = original(*args, **kwargs)
+            if stage is not None:
+                record(stage, perf_counter() - start)
+            if counter is not None:
+                count(counter, amount(result) if amount is not None else 1)
+            return result
+
+        setattr(obj, method, wrapper)
+        return original
+
+    def instrument_engine(self, engine):
+        """Rules and scoring stages of a RulesEngine (or GameController) and the chain work below them."""
+        self.wrap(engine, 'make_move', stage='rules')
+        self.wrap(engine, 'calculate_territory_score', stage='scoring')
+        groups = engine.groups
+        # Liberty questions answered from the chain tracker; every one replaces a flood fill
+        self.wrap(groups, 'is_suicide', counter='liberty_checks')
+        self.wrap(groups, 'captures', counter='liberty_checks')
+        self.wrap(groups, 'place', counter='stones_placed')
+        self.wrap(groups, 'remove_chain', counter='chain_stones_removed', amount=len)
+        self.wrap(groups, 'load', counter='chain_rebuilds')
+        self.wrap(engine.state, 'legal_moves', stage='legal_moves')
+
+    def instrument_board(self, board):
+        self.wrap(board, 'display_board', stage='render')
+        if hasattr(board, 'build_figure'):
+            self.wrap(board, 'build_figure', stage='figure_build')
+            self.wrap(board, 'update_figure', stage='figure_update')
+
+    def instrument_player(self, player):
+        self.wrap(player, 'get_play', stage='player')
+        player.profiler = self
+
+    def summary(self):
+        """Counters, per-move counter statistics and per-stage latency statistics as plain data."""
+        stages = {}
+        for name, samples in self.timings.items():
+            ordered = sorted(samples)
+            # Power-of-two buckets in microseconds: bucket k holds [2**k, 2**(k+1))
+            histogram = collections.Counter(int(math.log2(max(s * 1e6, 1))) for s in samples)
+            stages[name] = {
+                'calls': len(samples),
+                'total_s': sum(samples),
+                'mean_us': 1e6 * sum(samples) / len(samples),
+                'p50_us': 1e6 * ordered[len(ordered) // 2],
+                'p95_us': 1e6 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                'max_us': 1e6 * ordered[-1],
+                'histogram_us': {f"{2 ** k}-{2 ** (k + 1)}": histogram[k] for k in sorted(histogram)},
+            }
+
+        per_move = {}
+        for name in self.counters:
+            values = [move.get(name, 0) for move in self.moves]
+            if values:
+                per_move[name] = {'mean': sum(values) / len(values), 'max': max(values)}
+        return {'moves': len(self.moves), 'counters': dict(self.counters), 'per_move': per_move, 'stages': stages}
+
+    def to_json(self, path=None):
+        """The summary as a JSON string, also written to `path` if given."""
+        text = json.dumps(self.summary(), indent=1)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def table(self):
+        summary = self.summary()
+        lines = [f"Profile over {summary['moves']} moves",
+                 f"{'stage':<16} {'calls':>7} {'total s':>9} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'max us':>10}"]
+        for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['total_s']):
+            lines.append(f"{name:<16} {stage['calls']:>7} {stage['total_s']:>9.3f} {stage['mean_us']:>10.1f} "
+                         f"{stage['p50_us']:>10.1f} {stage['p95_us']:>10.1f} {stage['max_us']:>10.1f}")
+        if summary['counters']:
+            lines.append(f"{'counter':<22} {'total':>10} {'per move':>10} {'max/move':>10}")
+            for name, total in sorted(summary['counters'].items()):
+                move = summary['per_move'].get(name, {'mean': 0.0, 'max': 0})
+                lines.append(f"{name:<22} {total:>10} {move['mean']:>10.1f} {move['max']:>10}")
+        return '\n'.join(lines)
@@ -0,0 +1,594 @@
+import concurrent.futures
+import math
+import multiprocessing
+import random
+import time
+import numpy as np
+import BoardState as state
+import OpeningBook as opening_book
+import Scoring as scoring
+
+PASS = -1
+
+# Random cells tried before a playout falls back to scanning every empty cell
+PLAYOUT_PROBES = 8
+
+# Visits added to every node on a path while its playout is running in tree-parallel search
+VIRTUAL_LOSS = 1
+
+# Nodes of the shared tree of tree-parallel search (28 bytes each), and the visits a leaf of
+# it needs before it is expanded; a full tree stops growing and playouts start at its leaves
+TREE_CAPACITY = 2_000_000
+EXPAND_VISITS = 2
+
+# Evidence (game results plus search visits) a book move needs before it is played without searching
+BOOK_MIN_COUNT = 50
+
+# Search budget per move for each difficulty: (playouts, seconds)
+MODE_BUDGETS = {
+    'easy': (100, 0.05),
+    'medium': (400, 0.25),
+    'hard': (2000, 1.0),
+}
+
+
+class Node:
+    __slots__ = ('move', 'player', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, player, parent=None):
+        self.move = move          # flat cell index or PASS
+        self.player = player      # colour that played `move`
+        self.parent = parent
+        self.children = {}
+        self.untried = None       # filled in on the first visit
+        self.visits = 0
+        self.wins = 0.0           # from the point of view of `player`
+
+    def __getstate__(self):
+        # Untried moves are worked out again wherever the node is searched next
+        return self.move, self.player, self.parent, self.children, self.visits, self.wins
+
+    def __setstate__(self, state):
+        self.move, self.player, self.parent, self.children, self.visits, self.wins = state
+        self.untried = None
+
+
+class MCTSPlayer():
+    """
+    Offline computer player using Monte Carlo Tree Search with UCT selection.
+
+    The search runs in-process on a BoardState, making and unmaking moves through its undo
+    log; random playouts avoid filling their own eyes and are scored by territory, the same
+    way determine_winner settles a game. A move is searched until `playouts` playouts or
+    `time_limit` seconds are used, whichever comes first; `mode` picks both from
+    MODE_BUDGETS unless they are given explicitly. The subtree under the move actually
+    played is kept for the next turn. `get_play` has the same signature as
+    ComputerGPTPlayer.get_play.
+
+    With `workers` > 1 the search runs in worker processes, either with root parallelism
+    (`parallel='root'`: one copy of the tree per worker, merged afterwards) or on one tree in
+    shared memory with virtual loss (`parallel='tree'`). Call `close` to stop the workers.
+
+    With a `book` (an OpeningBook or its path) an early position whose most played legal
+    move has at least `book_min_count` evidence is answered from the book without searching,
+    and the root statistics of every early search are added to it for later games.
+    """
+
+    def __init__(self,
+                 mode: str = 'medium',
+                 board_size: int = 5,
+                 stone_color: str = 'white',
+                 playouts = None,
+                 time_limit = None,
+                 exploration = 1.4,
+                 workers = 1,
+                 parallel = 'root',
+                 book = None,
+                 book_min_count = BOOK_MIN_COUNT,
+                 seed = None):
+        self.mode = mode
+        self.board_size = board_size
+        self.stone_color = stone_color
+        self.player_id = 1 if stone_color == "black" else 2
+
+        mode_playouts, mode_time = MODE_BUDGETS[mode]
+        self.playouts = playouts if playouts is not None else mode_playouts
+        self.time_limit = time_limit if time_limit is not None else (mode_time if playouts is None else None)
+        self.exploration = exploration
+        self.random = random.Random(seed)
+
+        self.state = state.BoardState(board_size)
+        self.geometry = self.state.geometry
+        self.playout_limit = 2 * self.geometry.num_cells
+        self.root = None
+
+        # Parallel search: 'root' runs independent trees in worker processes, 'tree' shares one tree between them
+        self.workers = workers
+        self.parallel = parallel
+        self.pool = None
+        self.shared_tree = None
+        self.playouts_done = 0
+
+        self.book = opening_book.open_book(book)
+        self.book_min_count = book_min_count
+
+    def get_play(self, move_str, board, board_history, captured_stones) -> str:
+        self.sync(move_str, board)
+        move = self.book_move()
+        if move is None:
+            move = self.search()
+            self.record_search()
+        self.advance(move, self.player_id)
+        if move == PASS:
+            return "p"
+        x, y, z = self.geometry.coords(move)
+        return f"{chr(65 + x)}{y + 1}-{z + 1}"
+
+    def book_move(self):
+        """Legal move the opening book has enough evidence for in the current position, or None."""
+        if self.book is None or not self.book.covers(self.state.cells):
+            return None
+        legal = self.state.legal_moves(self.player_id)
+        return self.book.lookup(self.state.cells, self.player_id, self.book_min_count, legal)
+
+    def record_search(self):
+        """Add the visits and wins of the root children of the last search to the opening book."""
+        if self.book is None or not self.book.covers(self.state.cells):
+            return
+        results = {move: (child.visits, child.wins) for move, child in self.root.children.items() if child.visits}
+        self.book.add(self.state.cells, self.player_id, results)
+
+    def sync(self, move_str, board):
+        """Bring the internal position up to `board`, keeping the search tree when possible."""
+        opponent = 3 - self.player_id
+        if self.root is not None and move_str:
+            move = self.parse_move(move_str)
+            if move == PASS or (move is not None and self.state.cells[move] == 0):
+                self.advance(move, opponent)
+
+        board = np.asarray(board).reshape(-1)
+        if self.root is None or not np.array_equal(self.state.cells, board):
+            self.state.load(board)
+            self.root = Node(PASS if move_str and move_str.lower() == 'p' else None, opponent)
+        # Whatever happened before this point is history for the tree
+        self.root.parent = None
+
+    def advance(self, move, color):
+        """Play a move on the internal position and move the root to the matching child."""
+        if move != PASS:
+            self.state.play(move, color)
+        child = self.root.children.get(move) if self.root is not None else None
+        self.root = child if child is not None else Node(move, color)
+
+    def parse_move(self, move_str):
+        if move_str.lower() == 'p':
+            return PASS
+        try:
+            col_str, z_str = move_str.upper().split('-')
+            x, y, z = ord(col_str[0]) - ord('A'), int(col_str[1:]) - 1, int(z_str) - 1
+        except ValueError:
+            return None
+        if not self.geometry.on_board(x, y, z):
+            return None
+        return self.geometry.index(x, y, z)
+
+    def search(self):
+        """Run playouts from the root and return the most visited move."""
+        if self.workers > 1 and self.parallel == 'root':
+            return self.root_parallel_search()
+        if self.workers > 1 and self.parallel == 'tree':
+            return self.tree_parallel_search()
+
+        start = time.perf_counter()
+        root_marker = self.state.snapshot()
+        done = 0
+        while done < self.playouts:
+            if self.time_limit is not None and time.perf_counter() - start > self.time_limit:
+                break
+            self.run_playout(self.state, self.random)
+            self.state.restore(root_marker)
+            done += 1
+        self.playouts_done = done
+        return self.best_move()
+
+    def best_move(self):
+        if not self.root.children:
+            return PASS
+        return max(self.root.children.values(), key=lambda child: child.visits).move
+
+    def search_task(self, playouts):
+        """What a worker process needs to search the current position."""
+        return {'board_size': self.board_size,
+                'cells': self.state.cells.tobytes(),
+                'positions': self.state.history[:self.state.history_length - 1].tolist(),
+                'player_id': self.player_id,
+                'playouts': playouts,
+                'time_limit': self.time_limit,
+                'exploration': self.exploration,
+                'seed': self.random.getrandbits(63)}
+
+    def root_parallel_search(self):
+        """
+        Root parallelism: every worker process searches its own copy of the current tree
+        (the subtree kept from the previous turn) with its share of the playouts, and the
+        trees that come back are merged into ours node by node.
+        """
+        if self.pool is None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        tasks = []
+        for _ in range(self.workers):
+            task = self.search_task(max(1, self.playouts // self.workers))
+            task['root'] = self.root
+            tasks.append(task)
+
+        results = list(self.pool.map(root_search, tasks))
+        self.playouts_done = sum(done for _, done in results)
+        merge_trees(self.root, [tree for tree, _ in results])
+        return self.best_move()
+
+    def tree_parallel_search(self):
+        """
+        Tree parallelism: worker processes run playouts on one SharedTree in shared memory,
+        each making moves on its own copy of the position, with virtual loss on the path of
+        every running playout so the workers spread over different branches. The subtree
+        kept from the previous turn is copied into the shared tree first and the result is
+        read back into Nodes afterwards.
+        """
+        if self.pool is None:
+            lock = multiprocessing.Lock()
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=init_tree_worker,
+                                                               initargs=(lock,))
+            self.shared_tree = SharedTree(TREE_CAPACITY)
+        tree = self.shared_tree
+        tree.store(self.root)
+
+        deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+        tasks = []
+        for _ in range(self.workers):
+            task = self.search_task(self.playouts)
+            task.update(tree=tree.name, capacity=tree.capacity, deadline=deadline, root_move=self.root.move)
+            tasks.append(task)
+        list(self.pool.map(tree_search, tasks))
+
+        self.playouts_done = int(tree.header[1])
+        tree.load(self.root)
+        return self.best_move()
+
+    def shared_playout(self, tree, lock, rng, root_move):
+        """One playout of tree-parallel search on `tree`; False once the shared budget is spent."""
+        with lock:
+            if tree.header[1] >= self.playouts:
+                return False
+            tree.header[1] += 1
+
+        board_state = self.state
+        marker = board_state.snapshot()
+        node, color = 0, self.player_id
+        path = [0]
+        moves = [root_move]
+        while True:
+            first = tree.first_child[node]
+            if first < 0:
+                # A leaf is expanded once it has been visited enough, unless two passes ended the game
+                if (node != 0 and tree.visits[node] < EXPAND_VISITS) or moves[-2:] == [PASS, PASS]:
+                    break
+                first = tree.expand(lock, node, self.tree_moves(board_state, color))
+                if first < 0:
+                    break
+            node = self.select_shared(tree, node, first, rng)
+            tree.visits[node] += VIRTUAL_LOSS
+            path.append(node)
+            move = int(tree.move[node])
+            if move != PASS:
+                board_state.play(move, color)
+            moves.append(move)
+            color = 3 - color
+
+        passes = 2 if moves[-2:] == [PASS, PASS] else 1 if moves[-1] == PASS else 0
+        winner = self.playout(board_state, rng, color, passes)
+        # Node k at depth d holds the wins of the colour that played its move
+        for depth, k in enumerate(path):
+            player = self.player_id if depth % 2 else 3 - self.player_id
+            tree.visits[k] += 1 - (VIRTUAL_LOSS if depth else 0)
+            tree.wins[k] += 1.0 if winner == player else 0.5 if winner == 0 else 0.0
+        board_state.restore(marker)
+        return True
+
+    def select_shared(self, tree, node, first, rng):
+        """UCT child of a shared node; children nobody has visited yet are tried first, in random order."""
+        end = first + tree.num_children[node]
+        visits = tree.visits[first:end]
+        unvisited = np.flatnonzero(visits == 0)
+        if unvisited.size:
+            return first + int(unvisited[rng.randrange(unvisited.size)])
+        log_visits = math.log(max(tree.visits[node], 1))
+        scores = tree.wins[first:end] / visits + self.exploration * np.sqrt(log_visits / visits)
+        return first + int(scores.argmax())
+
+    def close(self):
+        """Shut down the worker processes of parallel search and free the shared tree."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared_tree is not None:
+            self.shared_tree.close(unlink=True)
+            self.shared_tree = None
+
+    def run_playout(self, board_state, rng):
+        """One selection, expansion, simulation and backpropagation pass."""
+        node = self.root
+        color = self.player_id
+
+        # Selection: walk down fully expanded nodes
+        while True:
+            if node.untried is None:
+                # A node merged in from a worker may already have some of its children
+                node.untried = [] if self.ends_game(node) else [
+                    move for move in self.tree_moves(board_state, color) if move not in node.children]
+            if node.untried or not node.children:
+                break
+            node = self.select_child(node)
+            if node.move != PASS:
+                board_state.play(node.move, color)
+            color = 3 - color
+
+        # Expansion: add one untried move
+        if node.untried:
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            if move != PASS:
+                board_state.play(move, color)
+            child = Node(move, color, node)
+            node.children[move] = child
+            node = child
+            color = 3 - color
+
+        # Simulation and backpropagation
+        passes = 2 if self.ends_game(node) else 1 if node.move == PASS else 0
+        winner = self.playout(board_state, rng, color, passes)
+        while node is not None:
+            node.visits += 1
+            if winner == node.player:
+                node.wins += 1.0
+            elif winner == 0:
+                node.wins += 0.5
+            node = node.parent
+
+    def select_child(self, node):
+        log_visits = math.log(max(node.visits, 1))
+        exploration = self.exploration
+        best, best_score = None, -1.0
+        for child in node.children.values():
+            score = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def is_eye(self, board_state, i, color):
+        colors = board_state.groups.color
+        return all(colors[n] == color for n in self.geometry.neighbors[i])
+
+    def ends_game(self, node):
+        """Two passes in a row end the game, the node is terminal."""
+        return node.move == PASS and node.parent is not None and node.parent.move == PASS
+
+    def tree_moves(self, board_state, color):
+        """Legal, non eye-filling moves of `color` (superko included), or a pass if there are none."""
+        neighbors = self.geometry.neighbor_matrix
+        own = np.append(board_state.cells == color, True)
+        eyes = own[neighbors].all(axis=1)
+        moves = np.flatnonzero(board_state.legal_moves(color) & ~eyes).tolist()
+        return moves if moves else [PASS]
+
+    def playout(self, board_state, rng, color, passes):
+        """
+        Play random moves to the end of the game and return the winning colour (0 for a tie);
+        `passes` is the number of passes in a row just before.
+        """
+        groups = board_state.groups
+        colors = groups.color
+        num_cells = self.geometry.num_cells
+        randrange = rng.randrange
+        for _ in range(self.playout_limit):
+            if passes >= 2:
+                break
+            moved = False
+            # A few random probes find a move cheaply while the board is still open
+            for _ in range(PLAYOUT_PROBES):
+                i = randrange(num_cells)
+                if colors[i] == 0 and not self.is_eye(board_state, i, color) and not groups.is_suicide(i, color):
+                    board_state.play(i, color)
+                    moved = True
+                    break
+            if not moved:
+                empty = [i for i, c in enumerate(colors) if c == 0]
+                while empty:
+                    k = randrange(len(empty))
+                    i = empty[k]
+                    empty[k] = empty[-1]
+                    empty.pop()
+                    if self.is_eye(board_state, i, color) or groups.is_suicide(i, color):
+                        continue
+                    board_state.play(i, color)
+                    moved = True
+                    break
+            passes = 0 if moved else passes + 1
+            color = 3 - color
+
+        owners = scoring.territory_owners(board_state.cells, self.board_size)
+        black, white = np.count_nonzero(owners == 1), np.count_nonzero(owners == 2)
+        if black == white:
+            return 0
+        return 1 if black > white else 2
+
+
+def merge_trees(node, copies):
+    """
+    Fold trees searched by worker processes into `node`. Every copy started from the
+    statistics of `node`, so each node ends up with its own counts plus what every copy
+    added to them.
+    """
+    base_visits, base_wins = node.visits, node.wins
+    node.visits = sum(copy.visits for copy in copies) - (len(copies) - 1) * base_visits
+    node.wins = sum(copy.wins for copy in copies) - (len(copies) - 1) * base_wins
+    for move in set().union(*(copy.children for copy in copies)):
+        child = node.children.get(move)
+        if child is None:
+            child = node.children[move] = Node(move, 3 - node.player, node)
+        # A child that is new to `node` starts from zero, so only the copies that have it count
+        merge_trees(child, [copy.children[move] for copy in copies if move in copy.children])
+    if node.untried is not None:
+        node.untried = [move for move in node.untried if move not in node.children]
+
+
+def worker_player(task):
+    """MCTSPlayer of a worker process, on the position of the task."""
+    player = MCTSPlayer(board_size=task['board_size'],
+                        stone_color="black" if task['player_id'] == 1 else "white",
+                        playouts=task['playouts'],
+                        time_limit=task['time_limit'],
+                        exploration=task['exploration'],
+                        seed=task['seed'])
+    player.state.load(np.frombuffer(task['cells'], dtype=np.int8))
+    player.state.add_positions(task['positions'])
+    return player
+
+
+def root_search(task):
+    """Worker side of root-parallel search: search a private copy of the tree and send it back."""
+    player = worker_player(task)
+    player.root = task['root']
+    player.search()
+    return player.root, player.playouts_done
+
+
+# Lock of the shared tree, handed to every worker process of tree-parallel search when it starts
+_tree_lock = None
+_shared_trees = {}
+
+
+def init_tree_worker(lock):
+    global _tree_lock
+    _tree_lock = lock
+
+
+def tree_search(task):
+    """Worker side of tree-parallel search: run playouts on the shared tree until the budget or deadline is spent."""
+    tree = _shared_trees.get(task['tree'])
+    if tree is None:
+        tree = _shared_trees[task['tree']] = SharedTree(task['capacity'], task['tree'])
+    player = worker_player(task)
+    deadline = task['deadline']
+    done = 0
+    while deadline is None or time.monotonic() < deadline:
+        if not player.shared_playout(tree, _tree_lock, player.random, task['root_move']):
+            break
+        done += 1
+    return done
+
+
+class SharedTree:
+    """
+    Search tree of tree-parallel search, kept in one block of shared memory.
+
+    Node k has visits[k] and wins[k] (for the colour that played move[k]); its children are
+    the num_children[k] nodes from first_child[k] on, all allocated when it is expanded,
+    and first_child[k] is -1 until then. Node 0 is the root. header[0] is the next free node
+    and header[1] the number of playouts started. Expansion and the playout count are
+    guarded by a lock; visits and wins are updated without one, so two workers backing up
+    through the same node at the same moment can lose an update, which the search shrugs off.
+    """
+
+    FIELDS = (('visits', np.float64), ('wins', np.float64), ('move', np.int32),
+              ('first_child', np.int32), ('num_children', np.int32))
+
+    def __init__(self, capacity, name=None):
+        from multiprocessing import shared_memory
+        size = 16 + capacity * sum(np.dtype(dtype).itemsize for _, dtype in self.FIELDS)
+        # Workers share the resource tracker of the process that made the block, which unlinks it in close
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.memory.name
+        self.capacity = capacity
+
+        buffer = self.memory.buf
+        self.header = np.ndarray(2, dtype=np.int64, buffer=buffer)
+        offset = 16
+        for field, dtype in self.FIELDS:
+            setattr(self, field, np.ndarray(capacity, dtype=dtype, buffer=buffer, offset=offset))
+            offset += capacity * np.dtype(dtype).itemsize
+
+    def clear(self, start, end):
+        self.visits[start:end] = 0
+        self.wins[start:end] = 0
+        self.first_child[start:end] = -1
+        self.num_children[start:end] = 0
+
+    def expand(self, lock, node, moves):
+        """Allocate the children of `node`; returns its first child, or -1 if the tree is full."""
+        with lock:
+            first = int(self.first_child[node])
+            if first >= 0:
+                return first  # another worker got there first
+            first = int(self.header[0])
+            end = first + len(moves)
+            if end > self.capacity:
+                return -1
+            self.move[first:end] = moves
+            self.clear(first, end)
+            self.header[0] = end
+            # Children are complete before first_child makes them visible
+            self.num_children[node] = len(moves)
+            self.first_child[node] = first
+        return first
+
+    def store(self, root):
+        """Copy a Node tree into the shared tree as node 0 onwards and reset the playout count."""
+        self.header[:] = (1, 0)
+        self.clear(0, 1)
+        self.move[0] = PASS
+        self.visits[0], self.wins[0] = root.visits, root.wins
+        stack = [(root, 0)]
+        while stack:
+            node, k = stack.pop()
+            if node.untried is None:
+                continue
+            children = list(node.children.values())
+            moves = [child.move for child in children] + node.untried
+            first = int(self.header[0])
+            end = first + len(moves)
+            if not moves or end > self.capacity:
+                continue
+            self.move[first:end] = moves
+            self.clear(first, end)
+            for j, child in enumerate(children, first):
+                self.visits[j], self.wins[j] = child.visits, child.wins
+                stack.append((child, j))
+            self.header[0] = end
+            self.num_children[k] = len(moves)
+            self.first_child[k] = first
+
+    def load(self, root):
+        """Rebuild the Nodes under `root` from the shared statistics; unvisited children become untried moves."""
+        root.children = {}
+        root.visits, root.wins = int(self.visits[0]), float(self.wins[0])
+        stack = [(root, 0)]
+        while stack:
+            node, k = stack.pop()
+            first = int(self.first_child[k])
+            if first < 0:
+                node.untried = None
+                continue
+            end = first + int(self.num_children[k])
+            visited = self.visits[first:end] > 0
+            node.untried = self.move[first:end][~visited].tolist()
+            for j in (first + np.flatnonzero(visited)).tolist():
+                child = Node(int(self.move[j]), 3 - node.player, node)
+                child.visits, child.wins = int(self.visits[j]), float(self.wins[j])
+                node.children[child.move] = child
+                stack.append((child, j))
+
+    def close(self, unlink=False):
+        # The arrays are views of the block, drop them before closing it
+        self.header = self.visits = self.wins = self.move = self.first_child = self.num_children = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
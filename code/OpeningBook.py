@@ -0,0 +1,238 @@
+"""
+Persistent opening book and evaluation cache.
+
+Move statistics for early positions are kept in an SQLite file, keyed by board size,
+canonical position hash (see Symmetry) and side to move, so the 48 images of a position
+share one entry. Every row counts the evidence for one move as (count, wins): finished
+self-play games add one count each, a search adds the visit counts and wins of its root
+children. Moves are stored on the canonical board and mapped back on lookup.
+
+The file is opened in WAL mode, so any number of processes can read it while one of them
+writes; every process opens its own connection on first use. Writes happen in one short
+transaction per game or search. Once the book holds more than `capacity` rows, the rows
+with the least evidence (oldest first among equals) are evicted.
+
+Build a book from self-play results:
+
+    python SelfPlay.py --games 2000 --sizes 5 --book book.sqlite
+    python OpeningBook.py book.sqlite --records games.g3dr --selfplay results.jsonl
+
+and pass it to a player with MCTSPlayer(book='book.sqlite') or ComputerGPTPlayer(book=...).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+import GameRecord as records
+import Replay as replay
+import Symmetry as symmetry
+
+PASS = records.PASS
+
+# Positions with at most this many stones on the board are kept in the book
+MAX_STONES = 8
+
+# Rows kept before the least used ones are evicted, and the share of the capacity freed at once
+CAPACITY = 200_000
+EVICT_FRACTION = 0.1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS moves (
+    board_size INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    color INTEGER NOT NULL,
+    move INTEGER NOT NULL,
+    count REAL NOT NULL,
+    wins REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (board_size, hash, color, move)
+);
+CREATE INDEX IF NOT EXISTS moves_evidence ON moves (count, updated);
+"""
+
+UPSERT = """
+INSERT INTO moves (board_size, hash, color, move, count, wins, updated) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (board_size, hash, color, move)
+DO UPDATE SET count = count + excluded.count, wins = wins + excluded.wins, updated = excluded.updated
+"""
+
+
+def signed(key):
+    """A uint64 hash as the signed 64-bit integer SQLite stores."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def size_of(cells):
+    return round(len(cells) ** (1 / 3))
+
+
+class OpeningBook:
+
+    def __init__(self, path, max_stones=MAX_STONES, capacity=CAPACITY, timeout=30.0):
+        self.path = path
+        self.max_stones = max_stones
+        self.capacity = capacity
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def connection(self):
+        """This process's connection, opened (and the schema created) on first use."""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def covers(self, cells):
+        return np.count_nonzero(cells) <= self.max_stones
+
+    def key(self, cells):
+        """
+        (board_size, signed canonical hash, symmetries) of a flat position, where `symmetries`
+        are all the k that map it onto its canonical form (more than one if it is symmetric).
+        """
+        board_size = size_of(cells)
+        hashes = symmetry.get_symmetries(board_size).hashes(cells)
+        best = hashes.min()
+        return board_size, signed(int(best)), np.flatnonzero(hashes == best)
+
+    def stats(self, cells, color):
+        """{move: (count, wins)} of a position, moves on the given board; empty if unknown."""
+        cells = np.asarray(cells, dtype=np.int8).reshape(-1)
+        if not self.covers(cells):
+            return {}
+        board_size, key, ks = self.key(cells)
+        rows = self.connection().execute(
+            'SELECT move, count, wins FROM moves WHERE board_size = ? AND hash = ? AND color = ?',
+            (board_size, key, color)).fetchall()
+        permutation = symmetry.get_symmetries(board_size).permutations[ks[0]]
+        return {(int(permutation[move]) if move != PASS else PASS): (count, wins) for move, count, wins in rows}
+
+    def lookup(self, cells, color, min_count=1, legal=None):
+        """
+        Most played move of a position with at least `min_count` evidence, or None. `legal`
+        is an optional bool mask; moves outside it are skipped, and a pass is never returned.
+        """
+        best, best_count = None, min_count - 1
+        for move, (count, wins) in self.stats(cells, color).items():
+            if move == PASS or (legal is not None and not legal[move]):
+                continue
+            if count > best_count:
+                best, best_count = move, count
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best
+
+    def rows(self, cells, color, results, now):
+        """
+        Rows to upsert for {move: (count, wins)} of one position. Moves are mapped to the
+        canonical board; on a symmetric position equivalent moves share the lowest cell.
+        """
+        board_size, key, ks = self.key(cells)
+        inverse = symmetry.get_symmetries(board_size).inverse[ks]
+        merged = {}
+        for move, (count, wins) in results.items():
+            move = int(inverse[:, move].min()) if move != PASS else PASS
+            total = merged.get(move, (0.0, 0.0))
+            merged[move] = (total[0] + count, total[1] + wins)
+        return [(board_size, key, color, move, float(count), float(wins), now)
+                for move, (count, wins) in merged.items()]
+
+    def add(self, cells, color, results):
+        """Add {move: (count, wins)} evidence for a position, e.g. the root statistics of a search."""
+        cells = np.asarray(cells, dtype=np.int8).reshape(-1)
+        if self.covers(cells) and results:
+            self.write(self.rows(cells, color, results, time.time()))
+
+    def add_game(self, record):
+        """Add one count per early move of a GameRecord, and a win if its player won the game."""
+        self.add_games([record])
+
+    def add_games(self, games):
+        now = time.time()
+        rows = []
+        for record in games:
+            moves = np.asarray(record.moves)
+            for ply, board_state in replay.replay_states(moves, record.board_size):
+                if ply >= len(moves) or moves[ply] == records.RESIGN or not self.covers(board_state.cells):
+                    break
+                color = 1 if ply % 2 == 0 else 2
+                winner = records.RESULT_CODES[record.winner]
+                wins = 1.0 if winner == color else 0.5 if winner == 3 else 0.0
+                rows.extend(self.rows(board_state.cells, color, {int(moves[ply]): (1, wins)}, now))
+        self.write(rows)
+
+    def write(self, rows):
+        """Upsert rows in one transaction and evict if the book outgrew its capacity."""
+        if not rows:
+            return
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(UPSERT, rows)
+            size = connection.execute('SELECT count(*) FROM moves').fetchone()[0]
+            if size > self.capacity:
+                excess = size - self.capacity + int(self.capacity * EVICT_FRACTION)
+                connection.execute('DELETE FROM moves WHERE rowid IN '
+                                   '(SELECT rowid FROM moves ORDER BY count, updated LIMIT ?)', (excess,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def __len__(self):
+        return self.connection().execute('SELECT count(*) FROM moves').fetchone()[0]
+
+    def __getstate__(self):
+        # Connections stay in the process that opened them
+        state = self.__dict__.copy()
+        state['_connection'] = state['_pid'] = None
+        return state
+
+
+def open_book(book):
+    """An OpeningBook from a path, or the book itself; None stays None."""
+    if book is None or isinstance(book, OpeningBook):
+        return book
+    return OpeningBook(book)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from finished games.")
+    parser.add_argument('book', help="SQLite book file, created if missing")
+    parser.add_argument('--records', nargs='*', default=[], help="binary game record files (see GameRecord)")
+    parser.add_argument('--selfplay', nargs='*', default=[], help="SelfPlay JSON lines files")
+    parser.add_argument('--max-stones', type=int, default=MAX_STONES, help="deepest positions kept, in stones")
+    parser.add_argument('--capacity', type=int, default=CAPACITY, help="rows kept before eviction")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    book = OpeningBook(arguments.book, arguments.max_stones, arguments.capacity)
+    added = 0
+    for path in arguments.records:
+        with records.GameRecordReader(path) as reader:
+            for record in reader:
+                book.add_game(record)
+                added += 1
+    for path in arguments.selfplay:
+        with open(path) as f:
+            for line in f:
+                book.add_game(records.from_selfplay(json.loads(line)))
+                added += 1
+    print(f"Added {added} games, the book holds {len(book)} moves")
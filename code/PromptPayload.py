@@ -0,0 +1,124 @@
+"""
+Compact messages for the remote assistant player.
+
+Instead of the printed NumPy board and the whole move history, a position is sent as the
+list of stones of each colour in move notation:
+
+    Black: A1-1 B2-3 C3-1. White: B2-2. Captured - Black: 0, White: 0.
+
+and once the assistant thread holds a position, later turns only carry what changed since
+the previous message: the opponent's move and the stones removed by captures.
+"""
+import numpy as np
+
+PASS = -1
+
+PAYLOAD_MODES = ('full', 'compact', 'delta')
+
+# Appended to the run instructions so the assistant can read the compact messages
+INSTRUCTIONS = ("Positions are given as the coordinates of the black and of the white stones. "
+                "When a message only names the opponent's move and the removed stones, apply them "
+                "and your own last move to the previous position.")
+
+
+def cell_names(board_size):
+    return [f"{chr(65 + x)}{y + 1}-{z + 1}"
+            for x in range(board_size) for y in range(board_size) for z in range(board_size)]
+
+
+def encode_board(cells, board_size):
+    """'Black: ... White: ...' coordinate lists of the stones of a board (3-D array or flat cells)."""
+    cells = np.asarray(cells).reshape(-1)
+    names = cell_names(board_size)
+    black = ' '.join(names[i] for i in np.flatnonzero(cells == 1))
+    white = ' '.join(names[i] for i in np.flatnonzero(cells == 2))
+    return f"Black: {black or '-'}. White: {white or '-'}."
+
+
+def legacy_payload(move_str, board, board_history, captured_stones):
+    """The original message: printed board array and the full move history."""
+    oponent_move_msg = f"The oponent made {move_str}. "
+    captured_stone_msg = f"The move caused stones to be captured: {captured_stones}" if any(captured_stones.values()) else ""
+    board_status_msg = f"The current board looks like this: {board}. "
+    move_history = f"This is the history of moves, that has led to the current board status: {board_history}."
+    return ''.join([oponent_move_msg, captured_stone_msg, board_status_msg, move_history])
+
+
+class PromptEncoder:
+    """
+    Builds the message of every turn for one assistant thread.
+
+    mode 'full' sends the legacy message, 'compact' the stone lists every turn and 'delta'
+    (the default) the stone lists on the first turn and only the opponent's move and the
+    removed stones afterwards. A delta turn falls back to the stone lists whenever the board
+    changed in a way a move and its captures cannot explain, e.g. after an undo or a new game.
+
+    The player reports the assistant's answer with `answered` and calls `forget` when it
+    plays a move of its own instead (a fallback or a book move). A delta is only sent if the
+    stones added since the last message are exactly that answer and the opponent's move.
+    """
+
+    def __init__(self, board_size, mode='delta'):
+        if mode not in PAYLOAD_MODES:
+            raise ValueError(f"Unknown payload mode {mode!r}, choose from {PAYLOAD_MODES}")
+        self.board_size = board_size
+        self.mode = mode
+        self.names = cell_names(board_size)
+        self.sent = None  # cells of the last position the thread knows about
+        self.reply = None  # cell the assistant answered with since then (PASS for a pass)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def payload(self, move_str, board, board_history, captured_stones):
+        if self.mode == 'full':
+            return legacy_payload(move_str, board, board_history, captured_stones)
+
+        cells = np.asarray(board).reshape(-1).astype(np.int8)
+        message = None
+        if self.mode == 'delta' and self.sent is not None:
+            message = self.delta(move_str, cells)
+        if message is None:
+            message = self.compact(move_str, cells, captured_stones)
+        self.sent = cells
+        self.reply = None
+        return message
+
+    def answered(self, move_str):
+        """The assistant's answer to the last message; one that is not a move on the board is forgotten."""
+        if move_str and move_str.lower() == 'p':
+            self.reply = PASS
+        elif move_str and move_str.upper() in self.index:
+            self.reply = self.index[move_str.upper()]
+        else:
+            self.forget()
+
+    def forget(self):
+        """The thread no longer matches the board, send the stone lists next turn."""
+        self.sent = None
+        self.reply = None
+
+    def compact(self, move_str, cells, captured_stones):
+        opponent_move = f"Opponent move: {move_str}. " if move_str else ""
+        captured = f" Captured - Black: {captured_stones['black']}, White: {captured_stones['white']}." if any(captured_stones.values()) else ""
+        return f"{opponent_move}Board: {encode_board(cells, self.board_size)}{captured}"
+
+    def delta(self, move_str, cells):
+        """Opponent move and removed stones since the last message, or None if they do not explain the board."""
+        added = np.flatnonzero((cells != 0) & (self.sent == 0))
+        removed = np.flatnonzero((cells == 0) & (self.sent != 0))
+        changed = np.flatnonzero((cells != 0) & (self.sent != 0) & (cells != self.sent))
+        if changed.size or self.reply is None:
+            return None
+        # Exactly the assistant's answer and the opponent's move can have been added
+        added_names = {self.names[i] for i in added}
+        expected = set()
+        if self.reply != PASS:
+            expected.add(self.names[self.reply])
+        if move_str and move_str.lower() != 'p':
+            expected.add(move_str.upper())
+        if added_names != expected:
+            return None
+
+        message = f"Opponent move: {move_str or 'none'}."
+        if removed.size:
+            message += " Removed: " + ' '.join(self.names[i] for i in removed) + "."
+        return message
@@ -0,0 +1,44 @@
+import numpy as np
+import BoardState as state
+
+
+class RandomPlayer():
+    """
+    Offline computer player that picks a uniformly random legal move.
+
+    It never fills its own single-point eyes (empty cells surrounded only by its own stones),
+    which keeps random games finite, and passes when nothing else is left. The `get_play`
+    signature matches ComputerGPTPlayer so the two are interchangeable.
+    """
+
+    def __init__(self,
+                 board_size: int,
+                 stone_color: str,
+                 seed = None):
+        self.board_size = board_size
+        self.stone_color = stone_color
+        self.player_id = 1 if stone_color == "black" else 2
+        self.rng = np.random.default_rng(seed)
+        self.state = state.BoardState(board_size)
+
+    def candidate_moves(self, board):
+        """Flat indices of the non-suicidal moves that do not fill one of our own eyes, in random order."""
+        self.state.load(board)
+        groups = self.state.groups
+        neighbors = self.state.geometry.neighbors
+        player_id = self.player_id
+
+        empty = np.flatnonzero(self.state.cells == 0)
+        self.rng.shuffle(empty)
+        for i in empty.tolist():
+            if all(groups.color[n] == player_id for n in neighbors[i]):
+                continue
+            if groups.is_suicide(i, player_id):
+                continue
+            yield i
+
+    def get_play(self, move_str, board, board_history, captured_stones) -> str:
+        for i in self.candidate_moves(board):
+            x, y, z = self.state.geometry.coords(i)
+            return f"{chr(65 + x)}{y + 1}-{z + 1}"
+        return "p"
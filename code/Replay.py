@@ -0,0 +1,151 @@
+"""
+Fast replay of stored games.
+
+Moves come as flat cell indices with PASS and RESIGN (see GameRecord) and are trusted to be
+legal, so positions are rebuilt straight on a BoardState without parsing, validation or
+output. Black moves first and every move, pass included, hands the turn over; a
+resignation leaves the position as it is and ends the game.
+
+For random access a record file can get a checkpoint file next to it ('<path>.ckpt') that
+holds the int8 position of every game at every CHECKPOINT_INTERVAL-th ply. Reaching ply k
+then means loading the nearest checkpoint and replaying fewer than CHECKPOINT_INTERVAL
+moves. The checkpoint index ('<path>.ckpt.idx') is a uint64 array: the interval followed
+by the byte offset of every game's first checkpoint.
+"""
+import os
+import numpy as np
+import BoardState as state
+import GameRecord as records
+
+CHECKPOINT_INTERVAL = 16
+
+CHECKPOINT_SUFFIX = '.ckpt'
+CHECKPOINT_INDEX_SUFFIX = '.ckpt.idx'
+
+
+def replay(moves, board_size, start=None, first_ply=0):
+    """
+    Yield (ply, cells) for every position of a game, ply 0 being the start position.
+
+    `cells` is the flat int8 buffer of one BoardState that is updated in place, copy it to
+    keep a position. `start` and `first_ply` resume from a known position, e.g. a checkpoint.
+    """
+    for ply, board_state in replay_states(moves, board_size, start, first_ply):
+        yield ply, board_state.cells
+
+
+def replay_states(moves, board_size, start=None, first_ply=0):
+    """Like replay, but yield (ply, board_state) so chains, hashes and superko history can be read too."""
+    board_state = state.BoardState(board_size)
+    if start is not None:
+        board_state.load(start)
+    color = 1 if first_ply % 2 == 0 else 2
+    yield first_ply, board_state
+    for ply, move in enumerate(moves[first_ply:], first_ply + 1):
+        if move >= 0:
+            board_state.play(int(move), color)
+        color = 3 - color
+        yield ply, board_state
+        if move == records.RESIGN:
+            return
+
+
+def positions(moves, board_size):
+    """(plies + 1, num_cells) int8 array of every position of a game."""
+    out = np.zeros((len(moves) + 1, board_size ** 3), dtype=np.int8)
+    for ply, cells in replay(moves, board_size):
+        out[ply] = cells
+    return out
+
+
+def position_at(moves, board_size, ply):
+    """Position after `ply` moves of a game, replayed from the start."""
+    for current, cells in replay(moves[:ply], board_size):
+        if current == ply:
+            return cells.copy()
+    raise IndexError(f"ply {ply} is past the end of the game")
+
+
+def checkpoints(moves, board_size, interval=CHECKPOINT_INTERVAL):
+    """(count, num_cells) int8 positions at plies 0, interval, 2 * interval, ..."""
+    return positions(moves, board_size)[::interval]
+
+
+def build_checkpoints(path, interval=CHECKPOINT_INTERVAL):
+    """Write the checkpoint file and index of a record file; returns the number of games."""
+    offsets = [interval]
+    offset = 0
+    with open(path + CHECKPOINT_SUFFIX, 'wb') as out:
+        for record in records.GameRecordReader(path):
+            offsets.append(offset)
+            data = checkpoints(record.moves, record.board_size, interval).tobytes()
+            out.write(data)
+            offset += len(data)
+    np.asarray(offsets, dtype='<u8').tofile(path + CHECKPOINT_INDEX_SUFFIX)
+    return len(offsets) - 1
+
+
+class Corpus:
+    """
+    Random access to the positions of a record file.
+
+        corpus = Corpus('games.g3d')
+        cells = corpus.position(game, ply)
+        samples = corpus.sample(1024, rng)
+
+    Games are read through the memory-mapped game index and checkpoints through a
+    memory-mapped checkpoint file, built on first use if it does not exist yet.
+    """
+
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.reader = records.GameRecordReader(path)
+        if not os.path.exists(path + CHECKPOINT_INDEX_SUFFIX):
+            build_checkpoints(path, interval)
+        index = np.fromfile(path + CHECKPOINT_INDEX_SUFFIX, dtype='<u8')
+        self.interval = int(index[0])
+        self.offsets = index[1:]
+        self.data = np.memmap(path + CHECKPOINT_SUFFIX, dtype=np.int8, mode='r') if self.offsets.size else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def game(self, n):
+        return self.reader[n]
+
+    def position(self, n, ply, record=None):
+        """Position of game n after `ply` moves, from its nearest checkpoint."""
+        record = record if record is not None else self.reader[n]
+        if not 0 <= ply <= len(record.moves):
+            raise IndexError(f"ply {ply} is outside game {n}")
+        num_cells = record.board_size ** 3
+        checkpoint = ply // self.interval
+        start = int(self.offsets[n]) + checkpoint * num_cells
+        cells = self.data[start:start + num_cells]
+
+        first_ply = checkpoint * self.interval
+        if first_ply == ply:
+            return np.array(cells)
+        for _, cells in replay(record.moves[:ply], record.board_size, start=cells, first_ply=first_ply):
+            pass
+        return cells.copy()
+
+    def sample(self, count, rng=None):
+        """
+        `count` random (game, ply, cells) positions, games drawn uniformly and plies uniformly
+        within each game. Samples are grouped by game so each record is decoded once.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        games = np.sort(rng.integers(len(self), size=count))
+        samples = []
+        record, record_n = None, None
+        for n in games.tolist():
+            if n != record_n:
+                record, record_n = self.reader[n], n
+            ply = int(rng.integers(len(record.moves) + 1))
+            samples.append((n, ply, self.position(n, ply, record)))
+        return samples
+
+    def close(self):
+        self.reader.close()
+        self.data = None
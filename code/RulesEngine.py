@@ -0,0 +1,250 @@
+import numpy as np
+import BoardGeometry as geometry
+import BoardState as state
+import Scoring as scoring
+import TranspositionTable as tt
+
+
+class RulesEngine:
+    """
+    Headless 3D Go rules: move validation, captures, superko, passes and scoring.
+
+    The engine never reads input, prints or sleeps. Anything worth reporting is handed to the
+    optional `on_event(event, message, data)` callback, where `event` is a short name such as
+    'invalid_move', 'capture' or 'game_over', `message` is the human readable text and `data`
+    a dict with the details. Without a callback nothing is formatted for output at all, so
+    the engine can be driven from code at full speed.
+
+    `backend` selects the chain structure of the BoardState, see BoardState.BACKENDS.
+    """
+
+    def __init__(self,
+                 board_size,
+                 captured_stones = None,
+                 territory = None,
+                 board_history = None,
+                 on_event = None,
+                 backend = 'unionfind'):
+        self.on_event = on_event
+        self.current_player = "black"
+
+        #board
+        self.board_size = board_size
+        self.geometry = geometry.get_geometry(board_size)
+        # Rules code works on the flat int8 cells, self.board is a 3-D view of the same buffer
+        self.state = state.BoardState(board_size, backend=backend)
+        self.cells = self.state.cells
+        self.board = self.state.board
+        self.groups = self.state.groups
+        # Results cached by position hash, shared by search and scoring
+        self.transposition_table = tt.TranspositionTable()
+        # Initialize captured stone counters for both players
+        self.captured_stones = captured_stones if captured_stones is not None else {"black": 0, "white": 0}
+        self.territory = territory if territory is not None else {'black': 0, 'white': 0}
+
+        # board history and last move tracker
+        self.board_history = board_history if board_history is not None else []
+        self.last_stone_captured = []
+        self.last_move: str = ""
+        self.last_move_player = None
+
+        #global coordinate system
+        self.directions = geometry.DIRECTIONS
+
+        #End game
+        self.pass_status = {'black': False, 'white': False}  # Track if each player has passed their last turn
+        self.game_over = False
+        self.result = None
+
+    def report(self, event, message, **data):
+        if self.on_event is not None:
+            self.on_event(event, message, data)
+
+    def track_captured_stones(self, current_player, removed_stones):
+        """Track the number of captured stones for each player."""
+        # The stones removed by a move are always the opponent's, so they count for the mover
+        self.captured_stones[current_player] += len(removed_stones)
+
+        self.report('captured_stones', f"Captured stones - Black: {self.captured_stones['black']}, White: {self.captured_stones['white']}",
+                    captured_stones=self.captured_stones)
+
+    def make_move(self, move_str, current_player):
+        player_id = 1 if current_player == "black" else 2
+
+        try:
+            # Convert move string to coordinates
+            x, y, z = self.parse_move(move_str)
+        except ValueError:
+            self.report('invalid_move', "Invalid move format. Please use the format 'LetterNumber-Number' (e.g., 'A1-1').",
+                        move=move_str, reason='format')
+            return False
+
+        if not self.is_valid_move(x, y, z):
+            return False
+
+        index = self.geometry.index(x, y, z)
+        if self.groups.is_suicide(index, player_id):
+            self.report('invalid_move', "Invalid move: Placing a stone here would result in suicide. Please try again.",
+                        move=move_str, reason='suicide')
+            return False
+
+        if self.state.repeats_position(index, player_id):
+            self.report('invalid_move', "Invalid move: This would repeat an earlier board position (ko). Please try again.",
+                        move=move_str, reason='ko')
+            return False
+        # Update the board, check for captures
+        self.state.place(index, player_id)
+        captured = self.is_captured(current_player, move_str)
+
+        # Provide feedback on the move result
+        if captured:
+            self.report('move', f"Move at {move_str} resulted in a capture.", move=move_str, player=current_player, captured=True)
+            self.track_captured_stones(current_player, removed_stones = self.state.undo_log[-1][2])
+        else:
+            self.report('move', f"Move at {move_str} did not result in a capture.", move=move_str, player=current_player, captured=False)
+
+        self.board_history.append(move_str)
+
+        return True
+
+    def undo_move(self):
+        """Take back the last stone placed with make_move, including its captures."""
+        if not self.state.undo_log:
+            return False
+        _, player_id, removed = self.state.undo()
+        self.captured_stones["black" if player_id == 1 else "white"] -= len(removed)
+        self.board_history.pop()
+        return True
+
+    def parse_move(self, move):
+        col_str, z_str = move.upper().split('-')
+        x = ord(col_str[0]) - ord('A')
+        y = int(col_str[1:]) - 1
+        z = int(z_str) - 1
+        return x, y, z
+
+    def move_to_str(self, x, y, z):
+        return f"{chr(65 + x)}{y + 1}-{z + 1}"
+
+    def is_valid_move(self, x, y, z):
+        # Check if the move is within the board and the position is not already occupied
+        if self.geometry.on_board(x, y, z) and self.cells[self.geometry.index(x, y, z)] == 0:
+            return True
+        self.report('invalid_move', "Invalid move: Position is either out of bounds or already occupied.",
+                    coords=(x, y, z), reason='occupied')
+        return False
+
+    def legal_moves(self, player=None, indices=False):
+        """
+        All legal moves of `player` (the side to move by default) at once, without reporting
+        anything: a bool mask over the flat cells, or their flat indices with `indices=True`.
+        """
+        player = player if player is not None else self.current_player
+        legal = self.state.legal_moves(1 if player == "black" else 2)
+        return np.flatnonzero(legal) if indices else legal
+
+    def is_suicidal_move(self, x, y, z, player_id):
+        # Answered from the chain liberties, the board is left untouched
+        return self.groups.is_suicide(self.geometry.index(x, y, z), player_id)
+
+    def check_for_opponent_capture(self, x, y, z, player_id):
+        return bool(self.groups.captures(self.geometry.index(x, y, z), player_id))
+
+    def is_captured(self, current_player, move_str):
+        player_id = 1 if current_player == "black" else 2
+        self.report('capture_check', f"\n--- Checking captures for move: {move_str} ---", move=move_str)
+
+        x, y, z = self.parse_move(move_str)
+        opponent = 3 - player_id
+        self.report('capture_check', f"Current player: {current_player}, Opponent: {opponent}", player=current_player)
+
+        captured = False
+        for removed in self.state.capture(self.geometry.index(x, y, z), opponent):
+            connected_stones = [self.geometry.coords(i) for i in removed]
+            self.report('capture', f"Capturing opponent's stones connected to {connected_stones[0]}", stones=connected_stones)
+            self.last_stone_captured.extend(connected_stones)
+            captured = True
+
+        self.report('capture_check', f"Capture result for move {move_str}: {'Captured' if captured else 'Not Captured'}",
+                    move=move_str, captured=captured)
+        return captured
+
+    def is_opponent_stone(self, x, y, z, opponent):
+        return self.geometry.on_board(x, y, z) and self.cells[self.geometry.index(x, y, z)] == opponent
+
+    def find_connected_stones(self, start_x, start_y, start_z, player) -> set():
+        """Find all stones connected to the starting stone of the same player."""
+        if not self.geometry.on_board(start_x, start_y, start_z):
+            return set()
+        i = self.geometry.index(start_x, start_y, start_z)
+        if self.groups.color[i] != player:
+            return set()
+        return {self.geometry.coords(s) for s in self.groups.chain(i)}
+
+    def has_liberty(self, stones):
+        """Check if the group of stones has any liberty."""
+        for x, y, z in stones:
+            for n in self.geometry.neighbors[self.geometry.index(x, y, z)]:
+                if self.cells[n] == 0:
+                    self.report('liberty', f"Liberty found at {self.geometry.coords(n)} for stones.", liberty=self.geometry.coords(n))
+                    return True
+        self.report('liberty', "No liberties found", liberty=None)
+        return False
+
+    def calculate_territory_score(self):
+        # Every empty region is labelled in one pass; the result only depends on the position
+        key = (self.state.hash, 'territory')
+        territory = self.transposition_table.get(key)
+        if territory is None:
+            territory = scoring.score_territory(self.cells, self.board_size)
+            self.transposition_table.put(key, territory)
+        self.territory = dict(territory)
+
+        self.report('territory', f"Territory score - Black: {self.territory['black']}, White: {self.territory['white']}",
+                    territory=self.territory)
+        return self.territory
+
+    def determine_winner(self):
+        """Score the position and return {'winner', 'margin', 'black', 'white'}; winner is None for a tie."""
+        # Territory captured
+        final_scores = self.calculate_territory_score()
+        black_score, white_score = final_scores['black'], final_scores['white']
+
+        # Determine the winner based on final scores
+        if black_score > white_score:
+            winner, message = "black", f"Game over. Black wins by {black_score - white_score} point(s)."
+        elif white_score > black_score:
+            winner, message = "white", f"Game over. White wins by {white_score - black_score} point(s)."
+        else:
+            winner, message = None, "Game over. It's a tie!"
+
+        self.result = {'winner': winner, 'margin': abs(black_score - white_score), 'black': black_score, 'white': white_score}
+        self.report('game_over', message, **self.result)
+        return self.result
+
+    def switch_turns(self, move_str):
+        self.last_move = move_str
+        self.last_move_player = self.current_player
+        self.current_player = "white" if self.current_player == "black" else "black"  # Switch players
+
+    def pass_check(self, current_player, move_str):
+        self.pass_status[current_player] = True  # Mark this player as having passed
+        if all(self.pass_status.values()):  # Check if both players have passed consecutively
+            self.report('passes', "Both players have passed consecutively. The game ends.")
+            self.determine_winner()
+            self.game_over = True
+        else:
+            # If only one player has passed, switch turns
+            self.switch_turns(move_str)
+
+    def play(self, move_str):
+        """Play a move ('A1-1' style or 'p' to pass) for the side to move; False if it is illegal."""
+        if move_str.lower() == 'p':
+            self.pass_check(self.current_player, move_str)
+            return True
+
+        self.pass_status = {'black': False, 'white': False}
+        if self.make_move(move_str, self.current_player):
+            self.switch_turns(move_str)
+            return True
+        return False
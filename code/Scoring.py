@@ -0,0 +1,64 @@
+import numpy as np
+import BoardGeometry as geometry
+
+
+def label_empty_regions(cells, board_size):
+    """
+    Label the 6-connected empty regions of a flat board in one vectorised pass.
+
+    Every empty cell starts with its own index as label. Each round takes the minimum label
+    over the cell and its empty neighbours and then jumps every label to its own label's
+    label, which roughly halves the remaining distance to the region minimum. Stones keep the
+    sentinel label num_cells. Returns the label array.
+    """
+    geo = geometry.get_geometry(board_size)
+    n = geo.num_cells
+    empty = np.asarray(cells).reshape(-1) == 0
+
+    labels = np.where(empty, np.arange(n), n)
+    padded = np.empty(n + 1, dtype=labels.dtype)
+    padded[n] = n
+    while True:
+        padded[:n] = labels
+        new_labels = np.minimum(labels, padded[geo.neighbor_matrix].min(axis=1))
+        new_labels[~empty] = n
+        padded[:n] = new_labels
+        new_labels = padded[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def territory_owners(cells, board_size):
+    """
+    Owner of every cell as seen by area counting of empty regions.
+
+    An empty region belongs to a colour when every stone bordering it is of that colour. The
+    edge of the board borders no colour, so a region running into it is owned all the same;
+    the recursive walk this replaced never counted such regions.
+    Returns a flat int8 array with 1 or 2 on owned empty cells and 0 elsewhere.
+    """
+    geo = geometry.get_geometry(board_size)
+    n = geo.num_cells
+    cells = np.asarray(cells).reshape(-1)
+    labels = label_empty_regions(cells, board_size)
+    empty = labels < n
+
+    # Bit 1 for a black neighbour, bit 2 for a white one, gathered per region
+    padded_cells = np.zeros(n + 1, dtype=np.int8)
+    padded_cells[:n] = cells
+    neighbor_colors = padded_cells[geo.neighbor_matrix]
+    border = (neighbor_colors == 1).any(axis=1).astype(np.int8) | ((neighbor_colors == 2).any(axis=1).astype(np.int8) << 1)
+    region_border = np.zeros(n + 1, dtype=np.int8)
+    np.bitwise_or.at(region_border, labels[empty], border[empty])
+
+    owners = np.zeros(n, dtype=np.int8)
+    owner_of_region = np.where(region_border == 3, 0, region_border)
+    owners[empty] = owner_of_region[labels[empty]]
+    return owners
+
+
+def score_territory(cells, board_size):
+    """Return a fresh {'black': points, 'white': points} count of the territory on a board."""
+    owners = territory_owners(cells, board_size)
+    return {'black': int(np.count_nonzero(owners == 1)), 'white': int(np.count_nonzero(owners == 2))}
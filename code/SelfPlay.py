@@ -0,0 +1,153 @@
+"""
+Headless self-play and tournament runner.
+
+Plays many games between two computer players across a process pool and appends one JSON
+line per finished game to the output file, as soon as the game ends:
+
+    python SelfPlay.py --games 2000 --sizes 3 4 5 --black random --white random --out results.jsonl
+
+Players are given either as a built-in name (see BUILTIN_PLAYERS) or as 'module:ClassName'.
+A player class is built as cls(board_size=..., stone_color=..., seed=...) and must provide
+get_play(move_str, board, board_history, captured_stones) like ComputerGPTPlayer. Built-in
+players also get their BUILTIN_OPTIONS, which replace any time-based budget by a fixed one.
+
+With --records the games are also appended to a compact binary record file (see GameRecord),
+and with --book their opening moves are added to an opening book (see OpeningBook).
+
+Every game gets its own seeds derived from --seed and the game number, so a run is fully
+reproducible whatever the number of workers or the order in which games finish.
+"""
+import argparse
+import concurrent.futures
+import importlib
+import json
+import os
+import numpy as np
+import GameRecord as records
+import OpeningBook as opening_book
+import RulesEngine as rules
+
+BUILTIN_PLAYERS = {
+    'random': 'RandomPlayer:RandomPlayer',
+    'mcts': 'MCTSPlayer:MCTSPlayer',
+}
+
+# A playout count instead of the 'medium' 0.25 s per move, so results do not depend on machine load
+BUILTIN_OPTIONS = {
+    'mcts': {'playouts': 400},
+}
+
+# Illegal answers a player may give in a row before it is made to pass
+MAX_ATTEMPTS = 10
+
+
+def load_player(spec):
+    module_name, class_name = BUILTIN_PLAYERS.get(spec, spec).split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def make_player(spec, board_size, stone_color, seed):
+    return load_player(spec)(board_size=board_size, stone_color=stone_color, seed=seed, **BUILTIN_OPTIONS.get(spec, {}))
+
+
+def game_seeds(base_seed, game_id):
+    """Seeds for the black and white player of one game."""
+    black, white = np.random.SeedSequence([base_seed, game_id]).spawn(2)
+    return int(black.generate_state(1)[0]), int(white.generate_state(1)[0])
+
+
+def play_game(task):
+    """Play one headless game and return its record."""
+    board_size = task['board_size']
+    engine = rules.RulesEngine(board_size)
+    black_seed, white_seed = game_seeds(task['seed'], task['game_id'])
+    players = {
+        'black': make_player(task['black'], board_size, 'black', black_seed),
+        'white': make_player(task['white'], board_size, 'white', white_seed),
+    }
+
+    moves = []
+    max_moves = task['max_moves'] or 3 * board_size ** 3
+    while not engine.game_over and len(moves) < max_moves:
+        player = players[engine.current_player]
+        for _ in range(MAX_ATTEMPTS):
+            move_str = player.get_play(engine.last_move, engine.board, engine.board_history, engine.captured_stones)
+            if move_str and engine.play(move_str):
+                break
+        else:
+            move_str = 'p'
+            engine.play(move_str)
+        moves.append(move_str)
+
+    result = engine.result if engine.result is not None else engine.determine_winner()
+    return {
+        'game_id': task['game_id'],
+        'board_size': board_size,
+        'black': task['black'],
+        'white': task['white'],
+        'winner': result['winner'],
+        'scores': {'black': result['black'], 'white': result['white']},
+        'captured_stones': dict(engine.captured_stones),
+        'moves': moves,
+    }
+
+
+def make_tasks(args):
+    tasks = []
+    for game_id in range(args.games):
+        black, white = args.black, args.white
+        if args.swap and game_id % 2:
+            black, white = white, black
+        tasks.append({'game_id': game_id,
+                      'board_size': args.sizes[game_id % len(args.sizes)],
+                      'black': black,
+                      'white': white,
+                      'seed': args.seed,
+                      'max_moves': args.max_moves})
+    return tasks
+
+
+def run(args):
+    tasks = make_tasks(args)
+    wins = {}
+    writer = records.GameRecordWriter(args.records) if args.records else None
+    book = opening_book.OpeningBook(args.book) if args.book else None
+    with open(args.out, 'a') as out, concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(play_game, task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            if writer is not None:
+                writer.write(records.from_selfplay(record))
+            if book is not None:
+                book.add_game(records.from_selfplay(record))
+            winner = record[record['winner']] if record['winner'] else 'tie'
+            wins[winner] = wins.get(winner, 0) + 1
+    if writer is not None:
+        writer.close()
+    if book is not None:
+        book.close()
+    return wins
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless 3D Go games across all cores.")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5], help="board sizes, used in turn")
+    parser.add_argument('--black', default='random', help="black player: built-in name or module:ClassName")
+    parser.add_argument('--white', default='random', help="white player: built-in name or module:ClassName")
+    parser.add_argument('--swap', action='store_true', help="swap colours every other game")
+    parser.add_argument('--max-moves', type=int, default=None, help="turn limit per game (default 3 * size**3)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="base seed for every game")
+    parser.add_argument('--out', default='selfplay.jsonl', help="JSON lines file results are appended to")
+    parser.add_argument('--records', default=None, help="binary game record file games are also appended to")
+    parser.add_argument('--book', default=None, help="opening book file the openings of the games are added to")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    summary = run(arguments)
+    print(f"Played {arguments.games} games: {summary}")
@@ -0,0 +1,80 @@
+import functools
+import itertools
+import numpy as np
+import Zobrist as zobrist
+
+
+class Symmetries:
+    """
+    The 48 symmetries of a board_size**3 cube (6 axis orders times 8 axis reflections) as
+    precomputed index permutations of the flat cell buffer.
+
+    Symmetry k maps a position to `cells[permutations[k]]`, so transformed cell j holds the
+    stone of original cell permutations[k][j]; a move on cell i lands on `inverse[k][i]`.
+    Symmetry 0 is the identity.
+
+    The canonical hash of a position is the smallest Zobrist hash among its 48 images and the
+    canonical form is the image with that hash, so equivalent positions share both. The hash
+    of every image is computed directly from the original cells with `keys`, where
+    keys[k, color, i] is the Zobrist key that a stone of `color` on cell i takes under
+    symmetry k; the same table lets a caller keep all 48 hashes up to date incrementally.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.num_cells = board_size ** 3
+        coords = np.indices((board_size,) * 3).reshape(3, -1)
+
+        permutations = []
+        for axes in itertools.permutations(range(3)):
+            for flips in itertools.product((False, True), repeat=3):
+                source = coords[list(axes)]
+                source = np.where(np.array(flips)[:, None], board_size - 1 - source, source)
+                permutations.append(np.ravel_multi_index(source, (board_size,) * 3))
+        self.permutations = np.array(permutations, dtype=np.intp)
+
+        self.inverse = np.empty_like(self.permutations)
+        rows = np.arange(len(permutations))[:, None]
+        self.inverse[rows, self.permutations] = np.arange(self.num_cells)
+
+        # keys[k, color, i] = zobrist key of `color` on cell inverse[k][i]
+        self.keys = zobrist.get_keys(board_size)[:, self.inverse].transpose(1, 0, 2).copy()
+
+        for array in (self.permutations, self.inverse, self.keys):
+            array.setflags(write=False)
+
+    def transform(self, cells, k):
+        """Image of a position under symmetry k, as a flat cell buffer."""
+        return np.asarray(cells).reshape(-1)[self.permutations[k]]
+
+    def transform_move(self, i, k):
+        """Cell that move i goes to under symmetry k."""
+        return int(self.inverse[k][i])
+
+    def hashes(self, cells):
+        """Zobrist hashes of the 48 images of a position, without building the images."""
+        cells = np.asarray(cells).reshape(-1)
+        return np.bitwise_xor.reduce(self.keys[:, cells, np.arange(self.num_cells)], axis=1)
+
+    def canonical_hash(self, cells):
+        return int(self.hashes(cells).min())
+
+    def canonical(self, cells):
+        """
+        (canonical cells, symmetry k, canonical hash) of a position; `transform_move(i, k)`
+        maps moves of the position to the canonical board.
+        """
+        hashes = self.hashes(cells)
+        k = int(hashes.argmin())
+        return self.transform(cells, k), k, int(hashes[k])
+
+
+@functools.lru_cache(maxsize=None)
+def get_symmetries(board_size) -> Symmetries:
+    """Return the shared symmetry tables for a board size, building them on first use."""
+    return Symmetries(board_size)
+
+
+def canonical_hash(board, board_size):
+    """Symmetry-independent hash of a board (3-D array or flat cells)."""
+    return get_symmetries(board_size).canonical_hash(board)
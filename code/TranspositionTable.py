@@ -0,0 +1,43 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    """
+    Bounded position cache keyed by Zobrist hash.
+
+    Entries are evicted in least-recently-used order once `capacity` is reached. Search and
+    scoring code store whatever they computed for a position (visit counts, scores, ...) and
+    look it up again the next time the same hash comes round.
+    """
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,27 @@
+import functools
+import numpy as np
+
+# Fixed so that hashes agree between processes and between runs
+ZOBRIST_SEED = 0x60D3
+
+
+@functools.lru_cache(maxsize=None)
+def get_keys(board_size):
+    """
+    Return the (3, num_cells) uint64 Zobrist table for a board size.
+
+    Row 0 (empty) is all zeros, rows 1 and 2 hold the keys of a black and a white stone on
+    each cell, so the hash of a flat cell buffer is the XOR of `keys[cells, arange(n)]`.
+    """
+    num_cells = board_size ** 3
+    rng = np.random.default_rng([ZOBRIST_SEED, board_size])
+    keys = np.zeros((3, num_cells), dtype=np.uint64)
+    keys[1:] = rng.integers(1, 2 ** 64, size=(2, num_cells), dtype=np.uint64, endpoint=False)
+    keys.setflags(write=False)
+    return keys
+
+
+def hash_cells(cells, keys):
+    """Hash a flat cell buffer from scratch (the incremental hash must always agree with this)."""
+    cells = np.asarray(cells).reshape(-1)
+    return int(np.bitwise_xor.reduce(keys[cells, np.arange(cells.size)]))
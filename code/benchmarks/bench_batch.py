@@ -0,0 +1,138 @@
+"""
+BatchSimulator: cross-check against RulesEngine and moves per second against BoardState.
+
+--check plays seeded random games on a BatchSimulator and one RulesEngine per game, mixing
+in passes and random, often illegal, moves. After every step it checks that each game
+accepted exactly the moves RulesEngine.play accepted, that the cells, liberty counts and
+hashes match, that the legal-move mask equals BoardState.playable_moves without the moves
+banned that turn, and at the end that the captures and the lists of empty cells agree and
+that load() rebuilds the same chains. Boards of size 2 and 3 repeat positions often enough
+to exercise superko.
+
+Then for every size it times random games to the end, counting passes as moves:
+
+    scalar  one game at a time on BoardState, trying random empty cells with is_suicide
+            and repeats_position like the MCTS playouts
+    batch   BatchSimulator.run on all games at once
+
+    python benchmarks/bench_batch.py --sizes 5 9 --games 1024 --check
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import BatchSimulator as batch  # noqa: E402
+import BoardState as board  # noqa: E402
+import RulesEngine as rules  # noqa: E402
+
+
+def check_empty_lists(sim):
+    for g in range(sim.num_games):
+        listed = sim.empty_cells[g, :sim.empty_count[g]]
+        assert np.array_equal(np.sort(listed), np.flatnonzero(sim.cells[g] == 0)), g
+        assert np.array_equal(sim.empty_index[g, listed], np.arange(len(listed))), g
+
+
+def cross_check(board_size, num_games, seed):
+    sim = batch.BatchSimulator(num_games, board_size, seed=seed)
+    engines = [rules.RulesEngine(board_size) for _ in range(num_games)]
+    steps = 0
+    while not sim.done.all():
+        legal = sim.legal_moves()
+        for g in np.flatnonzero(~sim.done).tolist():
+            playable, _ = engines[g].state.playable_moves(int(sim.to_move[g]))
+            assert np.array_equal(legal[g], playable & ~sim.banned[g]), (steps, g)
+
+        # Every other step goes through the mask, and a tenth of the games try anything
+        moves = sim.random_moves() if steps % 2 else sim.random_moves(legal)
+        moves = np.where(sim.rng.random(num_games) < 0.1, sim.rng.integers(-1, sim.num_cells, num_games), moves)
+        active = np.flatnonzero(~sim.done).tolist()
+        accepted = sim.step(moves)
+        for g in active:
+            engine, move = engines[g], int(moves[g])
+            move_str = engine.move_to_str(*engine.geometry.coords(move)) if move >= 0 else 'p'
+            assert engine.play(move_str) == accepted[g], (steps, g, move_str)
+
+        counts = sim.liberty_counts()
+        for g, engine in enumerate(engines):
+            assert np.array_equal(sim.cells[g], engine.cells), (steps, g)
+            assert np.array_equal(counts[g], engine.groups.liberty_counts()), (steps, g)
+            assert int(sim.hashes[g]) == engine.state.hash, (steps, g)
+        steps += 1
+
+    for g, engine in enumerate(engines):
+        assert tuple(sim.captured[g]) == (engine.captured_stones['black'], engine.captured_stones['white']), g
+    check_empty_lists(sim)
+
+    loaded = batch.BatchSimulator(num_games, board_size, seed=seed)
+    loaded.load(sim.cells)
+    assert np.array_equal(loaded.liberty_counts(), sim.liberty_counts())
+    check_empty_lists(loaded)
+    return steps, int(sim.captured.sum())
+
+
+def scalar_moves(board_size, num_games, seed):
+    """Moves per second of random games played one at a time on BoardState."""
+    rng = random.Random(seed)
+    max_moves = 3 * board_size ** 3
+    played = 0
+    start = time.perf_counter()
+    for _ in range(num_games):
+        state = board.BoardState(board_size)
+        groups = state.groups
+        color, passes, turns = 1, 0, 0
+        while passes < 2 and turns < max_moves:
+            empty = np.flatnonzero(state.cells == 0).tolist()
+            moved = False
+            while empty:
+                k = rng.randrange(len(empty))
+                i = empty[k]
+                empty[k] = empty[-1]
+                empty.pop()
+                if not groups.is_suicide(i, color) and not state.repeats_position(i, color):
+                    state.play(i, color)
+                    moved = True
+                    break
+            passes = 0 if moved else passes + 1
+            color = 3 - color
+            turns += 1
+        played += turns
+    return played / (time.perf_counter() - start)
+
+
+def batch_moves(board_size, num_games, seed):
+    sim = batch.BatchSimulator(num_games, board_size, seed=seed)
+    start = time.perf_counter()
+    sim.run()
+    return sim.move_count.sum() / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 9])
+    parser.add_argument('--games', type=int, default=1024, help="games played at once by the batch simulator")
+    parser.add_argument('--scalar-games', type=int, default=4, help="games played one at a time on BoardState")
+    parser.add_argument('--check', action='store_true', help="cross-check against RulesEngine on random games first")
+    parser.add_argument('--check-sizes', type=int, nargs='+', default=[2, 3, 4, 5])
+    parser.add_argument('--check-games', type=int, default=32, help="games per size for --check")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        for board_size in args.check_sizes:
+            steps, captured = cross_check(board_size, args.check_games, board_size)
+            print(f"size {board_size}: {args.check_games} games agree with RulesEngine over {steps} steps, "
+                  f"{captured} stones captured")
+
+    print(f"{'size':>4} {'games':>6} {'scalar moves/s':>15} {'batch moves/s':>14} {'speed-up':>8}")
+    for board_size in args.sizes:
+        scalar = scalar_moves(board_size, args.scalar_games, 0)
+        batched = batch_moves(board_size, args.games, 0)
+        print(f"{board_size:>4} {args.games:>6} {scalar:>15.0f} {batched:>14.0f} {batched / scalar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Bitboard backend: cross-check against the union-find backend and flood-fill timings.
+
+--check plays seeded random games on two RulesEngines, one per backend, and after every
+move compares cells, hashes, captures, legal-move masks, chain liberties and the suicide
+and capture answers on every empty cell, undoing a few moves along the way. Then for every
+size it times finding the chain and liberties of one stone of a large chain:
+
+    per-cell   the original find_connected_stones / has_liberty walk over (x, y, z) tuples
+    unionfind  GroupTracker.chain and liberty_count
+    bitboard   BitboardGroups.chain_mask and liberty_mask
+
+    python benchmarks/bench_bitboard.py --sizes 3 5 7 9 11 --check
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import BoardGeometry as geometry  # noqa: E402
+import RulesEngine as rules  # noqa: E402
+
+
+def cross_check(board_size, seed, moves):
+    engines = [rules.RulesEngine(board_size, backend=backend) for backend in ('unionfind', 'bitboard')]
+    reference, candidate = engines
+    rng = np.random.default_rng(seed)
+    num_cells = board_size ** 3
+    for turn in range(moves):
+        if reference.game_over:
+            break
+        color = 1 if reference.current_player == "black" else 2
+        legal = reference.legal_moves()
+        assert np.array_equal(legal, candidate.legal_moves()), f"legal moves differ at turn {turn}"
+        for i in np.flatnonzero(reference.cells == 0).tolist():
+            for player in (1, 2):
+                assert reference.groups.is_suicide(i, player) == candidate.groups.is_suicide(i, player), (turn, i)
+                assert bool(reference.groups.captures(i, player)) == bool(candidate.groups.captures(i, player)), (turn, i)
+        assert np.array_equal(reference.groups.liberty_counts(), candidate.groups.liberty_counts()), turn
+
+        if rng.random() < 0.05 and reference.board_history:
+            for engine in engines:
+                engine.undo_move()
+        else:
+            candidates = np.flatnonzero(legal)
+            move_str = reference.move_to_str(*reference.geometry.coords(int(rng.choice(candidates)))) if candidates.size and rng.random() > 0.02 else 'p'
+            for engine in engines:
+                engine.play(move_str)
+        assert np.array_equal(reference.cells, candidate.cells), f"cells differ at turn {turn}"
+        assert reference.state.hash == candidate.state.hash, f"hashes differ at turn {turn}"
+        assert reference.captured_stones == candidate.captured_stones, turn
+        for i in rng.integers(num_cells, size=8).tolist():
+            assert reference.groups.chain(i) == candidate.groups.chain(i), (turn, i)
+    return turn + 1
+
+
+def big_chain(board_size):
+    """Black on every cell except the all-even points: one chain holding most of the board."""
+    coords = np.indices((board_size,) * 3).reshape(3, -1)
+    cells = np.ones(board_size ** 3, dtype=np.int8)
+    cells[(coords % 2 == 0).all(axis=0)] = 0
+    return cells
+
+
+def per_cell_chain(board, board_size, start, player):
+    """The original tuple-stack flood fill followed by the liberty walk."""
+    directions = geometry.DIRECTIONS
+    stack = [start]
+    connected = set()
+    while stack:
+        x, y, z = stack.pop()
+        if (x, y, z) in connected or not (0 <= x < board_size and 0 <= y < board_size and 0 <= z < board_size):
+            continue
+        if board[x, y, z] == player:
+            connected.add((x, y, z))
+            stack.extend([(x + dx, y + dy, z + dz) for dx, dy, dz in directions])
+    liberties = set()
+    for x, y, z in connected:
+        for dx, dy, dz in directions:
+            nx, ny, nz = x + dx, y + dy, z + dz
+            if 0 <= nx < board_size and 0 <= ny < board_size and 0 <= nz < board_size and board[nx, ny, nz] == 0:
+                liberties.add((nx, ny, nz))
+    return connected, liberties
+
+
+def timed(function, min_time=0.2):
+    function()
+    loops = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        function()
+        loops += 1
+    return (time.perf_counter() - start) / loops
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 5, 7, 9, 11])
+    parser.add_argument('--check', action='store_true', help="cross-check the backends on random games first")
+    parser.add_argument('--games', type=int, default=3, help="random games per size for --check")
+    parser.add_argument('--moves', type=int, default=200, help="moves per checked game")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        for board_size in args.sizes:
+            turns = sum(cross_check(board_size, seed, args.moves) for seed in range(args.games))
+            print(f"size {board_size}: backends agree over {turns} turns")
+
+    print(f"{'size':>4} {'chain':>6} {'per-cell us':>12} {'unionfind us':>13} {'bitboard us':>12} {'vs per-cell':>11}")
+    for board_size in args.sizes:
+        cells = big_chain(board_size)
+        board = cells.astype(np.float64).reshape((board_size,) * 3)
+        engines = {backend: rules.RulesEngine(board_size, backend=backend) for backend in ('unionfind', 'bitboard')}
+        for engine in engines.values():
+            engine.state.load(cells)
+        start = 1  # cell (0, 0, 1) is black
+        tracker, bitboards = engines['unionfind'].groups, engines['bitboard'].groups
+
+        per_cell = timed(lambda: per_cell_chain(board, board_size, geometry.get_geometry(board_size).coords(start), 1))
+        unionfind = timed(lambda: (tracker.chain(start), tracker.liberty_count(start)))
+        bitboard = timed(lambda: bitboards.liberty_mask(bitboards.chain_mask(start)))
+        print(f"{board_size:>4} {len(tracker.chain(start)):>6} {per_cell * 1e6:>12.1f} {unionfind * 1e6:>13.2f} "
+              f"{bitboard * 1e6:>12.1f} {per_cell / bitboard:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Feature-plane extraction throughput.
+
+Replays random games and writes every position into one preallocated (N, C, S, S, S) array
+with FeatureExtractor.write_game, with and without random symmetry augmentation, and
+optionally into a memory-mapped .npy file:
+
+    python benchmarks/bench_features.py --sizes 5 7 9 --games 20 --memmap /tmp/planes.npy
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import Features as features  # noqa: E402
+import GameRecord as records  # noqa: E402
+from bench_suite import random_game  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 7, 9])
+    parser.add_argument('--games', type=int, default=10, help="random games per size")
+    parser.add_argument('--memmap', default=None, help="write the planes to this .npy file instead of memory")
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>4} {'planes':>6} {'positions':>9} {'plain pos/s':>12} {'augmented pos/s':>16} {'MB':>8}")
+    for board_size in args.sizes:
+        games = []
+        for seed in range(args.games):
+            moves, engine = random_game(board_size, seed)
+            games.append([records.move_from_str(move, board_size) for move in moves])
+        extractor = features.FeatureExtractor(board_size)
+        count = sum(len(moves) + 1 for moves in games)
+        out = extractor.allocate(count, args.memmap)
+
+        rates = []
+        for symmetries in (None, 'random'):
+            rng = np.random.default_rng(0)
+            start = time.perf_counter()
+            row = 0
+            for moves in games:
+                row = extractor.write_game(out, row, moves, symmetries=symmetries, rng=rng)
+            rates.append(row / (time.perf_counter() - start))
+        if args.memmap is not None:
+            out.flush()
+        print(f"{board_size:>4} {extractor.num_planes:>6} {row:>9} {rates[0]:>12.0f} {rates[1]:>16.0f} {out.nbytes / 1e6:>8.1f}")
+        del out
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold start time of the game modules.
+
+Imports each module in a fresh interpreter, the way a process-pool worker or a new game
+starts, and prints the median wall time over --runs interpreters next to the cost of an
+empty interpreter. With --detail the slowest imports of each module are listed from
+python -X importtime:
+
+    python benchmarks/bench_import.py --modules GameController SelfPlay --runs 20 --detail
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MODULES = ['RulesEngine', 'Board', 'GameController', 'SelfPlay', 'MCTSPlayer', 'ComputerPlayer', 'AsyncRemotePlayer']
+
+
+def start_time(statement, runs):
+    """Median seconds to run `statement` in a fresh interpreter."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], cwd=CODE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def slowest_imports(module, count):
+    """(cumulative microseconds, package) of the slowest imports below `module`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=CODE_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--runs', type=int, default=10, help="fresh interpreters per module")
+    parser.add_argument('--detail', action='store_true', help="list the slowest imports of each module")
+    args = parser.parse_args(argv)
+
+    empty = start_time('pass', args.runs)
+    print(f"{'module':>18} {'ms':>8} {'over empty':>10}")
+    print(f"{'(empty)':>18} {empty * 1e3:>8.1f} {0.0:>10.1f}")
+    for module in args.modules:
+        try:
+            seconds = start_time(f'import {module}', args.runs)
+        except subprocess.CalledProcessError:
+            print(f"{module:>18} {'fails':>8}")
+            continue
+        print(f"{module:>18} {seconds * 1e3:>8.1f} {(seconds - empty) * 1e3:>10.1f}")
+        if args.detail:
+            for cumulative, name in slowest_imports(module, 5):
+                print(f"{'':>18} {cumulative / 1e3:>8.1f}   {name}")
+
+
+if __name__ == "__main__":
+    main()
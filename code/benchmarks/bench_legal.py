@@ -0,0 +1,107 @@
+"""
+Legal-move masks: cross-check against RulesEngine.make_move and timings.
+
+--check plays seeded random games, undoing a move now and then, and after every move asks
+RulesEngine.make_move about every cell for both colours, taking each accepted move back
+with undo_move. The cells it accepts must be exactly the ones RulesEngine.legal_moves
+marks, and the liberty counts must match GroupTracker.liberty_count cell by cell. Boards
+of size 2 and 3 repeat positions often enough to exercise superko.
+
+Then for every size it times, on the position halfway through a random game:
+
+    per-cell  is_suicide and repeats_position on every empty cell, as make_move checks them
+    mask      BoardState.legal_moves for the whole board
+
+    python benchmarks/bench_legal.py --sizes 2 3 5 7 9 --check
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import RulesEngine as rules  # noqa: E402
+from bench_suite import random_game  # noqa: E402
+
+
+def accepted_moves(engine, player):
+    """Mask of the cells make_move accepts for `player`, leaving the engine as it was."""
+    accepted = np.zeros(engine.geometry.num_cells, dtype=bool)
+    for i in np.flatnonzero(engine.cells == 0).tolist():
+        if engine.make_move(engine.move_to_str(*engine.geometry.coords(i)), player):
+            accepted[i] = True
+            engine.undo_move()
+    return accepted
+
+
+def cross_check(board_size, seed, moves):
+    engine = rules.RulesEngine(board_size)
+    rng = np.random.default_rng(seed)
+    num_cells = engine.geometry.num_cells
+    for turn in range(moves):
+        if engine.game_over:
+            break
+        for player in ("black", "white"):
+            assert np.array_equal(engine.legal_moves(player), accepted_moves(engine, player)), (turn, player)
+        counts = engine.groups.liberty_counts()
+        for i in range(num_cells):
+            assert counts[i] == (engine.groups.liberty_count(i) if engine.cells[i] else 0), (turn, i)
+
+        if rng.random() < 0.05 and engine.board_history:
+            engine.undo_move()
+        else:
+            candidates = engine.legal_moves(indices=True)
+            move_str = engine.move_to_str(*engine.geometry.coords(int(rng.choice(candidates)))) if candidates.size and rng.random() > 0.02 else 'p'
+            engine.play(move_str)
+    return turn + 1
+
+
+def per_cell_moves(state, color):
+    legal = np.zeros(state.geometry.num_cells, dtype=bool)
+    for i in np.flatnonzero(state.cells == 0).tolist():
+        legal[i] = not state.groups.is_suicide(i, color) and not state.repeats_position(i, color)
+    return legal
+
+
+def timed(function, min_time=0.2):
+    function()
+    loops = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        function()
+        loops += 1
+    return (time.perf_counter() - start) / loops
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 3, 5, 7, 9])
+    parser.add_argument('--check', action='store_true', help="cross-check against make_move on random games first")
+    parser.add_argument('--games', type=int, default=3, help="random games per size for --check")
+    parser.add_argument('--moves', type=int, default=150, help="moves per checked game")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        for board_size in args.sizes:
+            turns = sum(cross_check(board_size, seed, args.moves) for seed in range(args.games))
+            print(f"size {board_size}: legal moves agree with make_move over {turns} turns")
+
+    print(f"{'size':>4} {'empty':>6} {'per-cell us':>12} {'mask us':>9} {'speed-up':>8}")
+    for board_size in args.sizes:
+        moves, _ = random_game(board_size, 0)
+        engine = rules.RulesEngine(board_size)
+        for move_str in moves[:len(moves) // 2]:
+            engine.play(move_str)
+        state = engine.state
+        color = 1 if engine.current_player == "black" else 2
+        assert np.array_equal(per_cell_moves(state, color), state.legal_moves(color))
+
+        per_cell = timed(lambda: per_cell_moves(state, color))
+        mask = timed(lambda: state.legal_moves(color))
+        print(f"{board_size:>4} {np.count_nonzero(state.cells == 0):>6} {per_cell * 1e6:>12.1f} {mask * 1e6:>9.1f} "
+              f"{per_cell / mask:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
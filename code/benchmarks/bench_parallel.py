@@ -0,0 +1,55 @@
+"""
+Search throughput of MCTSPlayer against the number of workers.
+
+Runs one search per (board size, mode, workers) from the empty board with a fixed time
+budget and prints the playouts per second and the speed-up over a single worker:
+
+    python benchmarks/bench_parallel.py --sizes 5 7 9 --workers 1 2 4 8 16 32 --seconds 5
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import MCTSPlayer as mcts_player  # noqa: E402
+
+
+def measure(board_size, workers, parallel, seconds):
+    player = mcts_player.MCTSPlayer(board_size=board_size, stone_color='black', playouts=10 ** 9,
+                                    time_limit=seconds, workers=workers, parallel=parallel, seed=0)
+    board = np.zeros((board_size,) * 3, dtype=np.int8)
+    if workers > 1:
+        # Start the worker processes before timing
+        player.playouts, player.time_limit = workers, None
+        player.get_play("", board, [], {})
+        player.playouts, player.time_limit = 10 ** 9, seconds
+        player.root = None
+    start = time.perf_counter()
+    player.get_play("", board, [], {})
+    elapsed = time.perf_counter() - start
+    player.close()
+    return player.playouts_done / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 7, 9])
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count()}))
+    parser.add_argument('--modes', nargs='+', default=['root', 'tree'], choices=['root', 'tree'])
+    parser.add_argument('--seconds', type=float, default=3.0, help="search time per measurement")
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>4} {'mode':>5} {'workers':>7} {'playouts/s':>11} {'speed-up':>8}")
+    for board_size in args.sizes:
+        for parallel in args.modes:
+            single = None
+            for workers in args.workers:
+                rate = measure(board_size, workers, parallel, args.seconds)
+                single = single or rate
+                print(f"{board_size:>4} {parallel:>5} {workers:>7} {rate:>11.1f} {rate / single:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
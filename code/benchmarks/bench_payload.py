@@ -0,0 +1,62 @@
+"""
+Size of the messages sent to the remote player, per payload mode.
+
+Plays random games and, every time the remote side is to move, builds the message each
+PromptEncoder mode would send. The legacy 'full' mode prints a float64 board like the
+original GameController did. Prints the mean and last-turn message size in bytes at a few
+points of the game:
+
+    python benchmarks/bench_payload.py --sizes 3 5 7 9 --lengths 10 50 200
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import PromptPayload as prompt  # noqa: E402
+import RandomPlayer as random_player  # noqa: E402
+import RulesEngine as rules  # noqa: E402
+
+
+def measure(board_size, length, seed):
+    """Mean and last message size of every mode over the first `length` moves of a random game."""
+    engine = rules.RulesEngine(board_size)
+    players = {color: random_player.RandomPlayer(board_size, color, seed=seed + k)
+               for k, color in enumerate(('black', 'white'))}
+    encoders = {mode: prompt.PromptEncoder(board_size, mode) for mode in prompt.PAYLOAD_MODES}
+    sizes = {mode: [] for mode in prompt.PAYLOAD_MODES}
+
+    while len(engine.board_history) < length and not engine.game_over:
+        if engine.current_player == 'white':
+            board = engine.board.astype(np.float64)
+            for mode, encoder in encoders.items():
+                message = encoder.payload(engine.last_move, board, engine.board_history, engine.captured_stones)
+                sizes[mode].append(len(message.encode('utf-8')))
+        move_str = players[engine.current_player].get_play(engine.last_move, engine.board, engine.board_history,
+                                                            engine.captured_stones)
+        if engine.current_player == 'white':
+            # White stands in for the assistant, its moves are the answers to the messages
+            for encoder in encoders.values():
+                encoder.answered(move_str)
+        engine.play(move_str)
+    return {mode: (np.mean(values), values[-1]) for mode, values in sizes.items() if values}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 5, 7, 9])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 50, 200], help="game lengths in moves")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>4} {'moves':>5} " + ' '.join(f"{mode + ' mean':>12} {mode + ' last':>12}" for mode in prompt.PAYLOAD_MODES))
+    for board_size in args.sizes:
+        for length in args.lengths:
+            result = measure(board_size, length, args.seed)
+            print(f"{board_size:>4} {length:>5} " + ' '.join(f"{result[mode][0]:>12.0f} {result[mode][1]:>12d}"
+                                                             for mode in prompt.PAYLOAD_MODES))
+
+
+if __name__ == "__main__":
+    main()
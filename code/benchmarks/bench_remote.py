@@ -0,0 +1,191 @@
+"""
+AsyncRemotePlayer against an in-process fake of the assistants API.
+
+FakeClient looks like openai.AsyncOpenAI to the player: every run goes through a list of
+statuses, one per retrieve after `latency` seconds, and a completed run answers with a
+random cell. Nothing leaves the process, so the timings measure the player and the event
+loop, not the network.
+
+--check first checks the fallbacks and the deadline:
+
+    failed, cancelled, expired  the status is reported and the fallback player moves
+    deadline                    a run that never finishes is cancelled, the fallback moves
+                                and the next message carries the whole board again
+    completed                   the assistant's move is played, the next message is a delta
+    play_games                  concurrent games each get their own thread, finish with
+                                moves RulesEngine accepts, and overlap their waiting
+
+Then it times play_games for every number of concurrent games:
+
+    python benchmarks/bench_remote.py --games 1 8 64 --latency 0.01 --check
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import AsyncRemotePlayer as remote_player  # noqa: E402
+import PromptPayload as prompt  # noqa: E402
+import RulesEngine as rules  # noqa: E402
+
+
+class FakeClient:
+    """The part of openai.AsyncOpenAI the remote player uses, answering from memory."""
+
+    def __init__(self, board_size=5, statuses=('queued', 'in_progress', 'completed'), latency=0.0, seed=0):
+        self.statuses = list(statuses)
+        self.latency = latency
+        self.names = prompt.cell_names(board_size)
+        self.random = random.Random(seed)
+        self.ids = itertools.count()
+        self.runs = {}
+        self.messages = {}
+        self.cancelled = []
+        self.retrieves = 0
+        space = types.SimpleNamespace
+        self.beta = space(threads=space(create=self.create_thread,
+                                        messages=space(create=self.create_message, list=self.list_messages),
+                                        runs=space(create=self.create_run, retrieve=self.retrieve_run,
+                                                   cancel=self.cancel_run)))
+
+    async def create_thread(self):
+        thread_id = f'thread_{next(self.ids)}'
+        self.messages[thread_id] = []
+        return types.SimpleNamespace(id=thread_id)
+
+    async def create_message(self, thread_id, role, content):
+        self.messages[thread_id].append(content)
+
+    async def create_run(self, thread_id, assistant_id, instructions):
+        run_id = f'run_{next(self.ids)}'
+        self.runs[run_id] = iter(self.statuses)
+        return types.SimpleNamespace(id=run_id, status=next(self.runs[run_id]))
+
+    async def retrieve_run(self, thread_id, run_id):
+        self.retrieves += 1
+        await asyncio.sleep(self.latency)
+        # The last status repeats, so a run can stay in progress forever
+        return types.SimpleNamespace(id=run_id, status=next(self.runs[run_id], self.statuses[-1]))
+
+    async def cancel_run(self, thread_id, run_id):
+        self.cancelled.append(run_id)
+
+    async def list_messages(self, thread_id, order, limit):
+        text = types.SimpleNamespace(value=f"move_str: {self.random.choice(self.names)}")
+        message = types.SimpleNamespace(role='assistant', content=[types.SimpleNamespace(type='text', text=text)])
+        return types.SimpleNamespace(data=[message])
+
+
+def make_player(client, board_size=5, **options):
+    options = {'poll_initial': 0.001, 'poll_max': 0.01, 'move_deadline': 5.0, 'seed': 0, **options}
+    return remote_player.AsyncRemotePlayer(board_size=board_size, client=client, assistant_id='fake', **options)
+
+
+async def opening_move(player, board_size):
+    """The remote player's answer to black's first move, and the engine it was asked on."""
+    engine = rules.RulesEngine(board_size)
+    engine.play('A1-1')
+    move = await player.get_play_async(engine.last_move, engine.board, engine.board_history, engine.captured_stones)
+    return move, engine
+
+
+async def check_statuses(board_size):
+    for status in ('failed', 'cancelled', 'expired'):
+        client = FakeClient(board_size, statuses=['queued', status])
+        player = make_player(client, board_size)
+        move, engine = await opening_move(player, board_size)
+        assert player.last_status == status, (status, player.last_status)
+        assert player.fallbacks == 1, status
+        assert engine.play(move), f"fallback move {move!r} after {status} is illegal"
+        # The fallback move is not the assistant's, the next message is the whole board again
+        assert player.prompt.sent is None, status
+
+
+async def check_deadline(board_size):
+    client = FakeClient(board_size, statuses=['queued', 'in_progress'])
+    player = make_player(client, board_size, move_deadline=0.05)
+    start = time.perf_counter()
+    move, engine = await opening_move(player, board_size)
+    assert time.perf_counter() - start < 1.0, "the deadline did not stop polling"
+    assert player.last_status == 'timeout', player.last_status
+    assert len(client.cancelled) == 1 and player.run_id is None, client.cancelled
+    assert player.fallbacks == 1
+    assert engine.play(move), f"fallback move {move!r} after the deadline is illegal"
+
+    # The thread never saw the fallback move, so the next run is asked with the stone lists
+    client.statuses = ['queued', 'completed']
+    engine.play('p')
+    await player.get_play_async(engine.last_move, engine.board, engine.board_history, engine.captured_stones)
+    assert player.last_status == 'completed' and player.fallbacks == 1, player.last_status
+    assert 'Board:' in client.messages[player.thread_id][-1], "expected the whole board after a fallback"
+
+
+async def check_completed(board_size):
+    client = FakeClient(board_size, statuses=['queued', 'in_progress', 'completed'])
+    player = make_player(client, board_size)
+    move, engine = await opening_move(player, board_size)
+    assert player.last_status == 'completed' and player.fallbacks == 0, player.last_status
+    assert move in client.names
+    if engine.play(move):
+        engine.play('p')
+        await player.get_play_async(engine.last_move, engine.board, engine.board_history, engine.captured_stones)
+        assert 'Board:' not in client.messages[player.thread_id][-1], "expected a delta message"
+
+
+async def check_play_games(board_size, num_games, latency):
+    client = FakeClient(board_size, latency=latency)
+    start = time.perf_counter()
+    games = await remote_player.play_games(num_games, board_size=board_size, client=client, max_moves=20,
+                                           poll_initial=latency, poll_max=latency)
+    elapsed = time.perf_counter() - start
+    assert len(games) == num_games and len(client.messages) == num_games, len(client.messages)
+    for game in games:
+        engine = rules.RulesEngine(board_size)
+        for move in game['moves']:
+            assert engine.play(move), (game['game_id'], move)
+    # One game waits for every retrieve in turn, concurrent games wait at the same time
+    assert elapsed < client.retrieves * latency / 2, (elapsed, client.retrieves)
+
+
+def check(board_size):
+    asyncio.run(check_statuses(board_size))
+    asyncio.run(check_deadline(board_size))
+    asyncio.run(check_completed(board_size))
+    asyncio.run(check_play_games(board_size, 8, 0.01))
+
+
+def measure(board_size, num_games, latency, max_moves):
+    client = FakeClient(board_size, latency=latency)
+    start = time.perf_counter()
+    games = asyncio.run(remote_player.play_games(num_games, board_size=board_size, client=client, max_moves=max_moves,
+                                                 poll_initial=latency, poll_max=latency))
+    elapsed = time.perf_counter() - start
+    return sum(len(game['moves']) for game in games) / elapsed, client.retrieves / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=5)
+    parser.add_argument('--games', type=int, nargs='+', default=[1, 8, 64], help="concurrent games per measurement")
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds every retrieve of a run takes")
+    parser.add_argument('--moves', type=int, default=40, help="moves per game")
+    parser.add_argument('--check', action='store_true', help="check statuses, deadlines and concurrent games first")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check(args.size)
+        print("check: statuses, deadline, delta and concurrent games ok")
+
+    print(f"{'games':>5} {'moves/s':>9} {'polls/s':>9}")
+    for num_games in args.games:
+        moves, polls = measure(args.size, num_games, args.latency, args.moves)
+        print(f"{num_games:>5} {moves:>9.1f} {polls:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
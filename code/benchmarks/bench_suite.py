@@ -0,0 +1,193 @@
+"""
+Benchmark suite for the rules engine, scoring and rendering.
+
+Every benchmark runs on board sizes 3 to 11 from positions generated with a fixed seed, so
+two runs measure the same work:
+
+    make_move        replaying a random game through RulesEngine.make_move (time per move)
+    suicide          is_suicidal_move on every point of a position with one huge chain
+    capture          check_for_opponent_capture on the same kind of position, chain in atari
+    territory        calculate_territory_score on a finished random game
+    render_3d        building and filling the Board 3D figure (skipped without plotly)
+
+Each timing is the best of --repeat rounds. Results can be saved as a baseline and later
+runs compared against it; a benchmark slower than the baseline by more than --tolerance
+is reported as a regression and the script exits with status 1:
+
+    python benchmarks/bench_suite.py --save benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import RulesEngine as rules  # noqa: E402
+
+SIZES = list(range(3, 12))
+
+
+def random_game(board_size, seed, max_moves=None):
+    """Moves of a random game that never fills its own eyes, played until two passes or max_moves."""
+    engine = rules.RulesEngine(board_size)
+    rng = np.random.default_rng(seed)
+    neighbors = engine.geometry.neighbor_matrix
+    max_moves = max_moves if max_moves is not None else 3 * engine.geometry.num_cells
+    moves = []
+    while not engine.game_over and len(moves) < max_moves:
+        color = 1 if engine.current_player == "black" else 2
+        eyes = np.append(engine.cells == color, True)[neighbors].all(axis=1)
+        candidates = np.flatnonzero(engine.legal_moves() & ~eyes)
+        move_str = engine.move_to_str(*engine.geometry.coords(int(rng.choice(candidates)))) if candidates.size else 'p'
+        engine.play(move_str)
+        moves.append(move_str)
+    return moves, engine
+
+
+def big_chain_position(board_size, in_atari):
+    """
+    Black fills every cell except the points with all-even coordinates, which leaves one chain
+    around isolated empty holes. With `in_atari` every hole but one is filled with white, so
+    the chain has a single liberty left.
+    """
+    engine = rules.RulesEngine(board_size)
+    coords = np.indices((board_size,) * 3).reshape(3, -1)
+    holes = np.flatnonzero((coords % 2 == 0).all(axis=0))
+    cells = np.ones(engine.geometry.num_cells, dtype=np.int8)
+    cells[holes] = 0
+    if in_atari:
+        cells[holes[1:]] = 2
+    engine.state.load(cells)
+    return engine, holes
+
+
+def bench_make_move(board_size):
+    moves, _ = random_game(board_size, seed=board_size, max_moves=board_size ** 3)
+
+    def run():
+        engine = rules.RulesEngine(board_size)
+        for move_str in moves:
+            engine.play(move_str)
+    return run, len(moves)
+
+
+def bench_suicide(board_size):
+    engine, holes = big_chain_position(board_size, in_atari=False)
+    points = [engine.geometry.coords(int(i)) for i in holes]
+
+    def run():
+        for x, y, z in points:
+            engine.is_suicidal_move(x, y, z, 2)
+    return run, len(points)
+
+
+def bench_capture(board_size):
+    engine, holes = big_chain_position(board_size, in_atari=True)
+    x, y, z = engine.geometry.coords(int(holes[0]))
+
+    def run():
+        for _ in range(100):
+            engine.check_for_opponent_capture(x, y, z, 2)
+    return run, 100
+
+
+def bench_territory(board_size):
+    _, engine = random_game(board_size, seed=board_size)
+
+    def run():
+        # Score for real every time, not from the transposition table
+        engine.transposition_table.clear()
+        engine.calculate_territory_score()
+    return run, 1
+
+
+def bench_render_3d(board_size):
+    try:
+        import Board as game
+    except ImportError:
+        return None
+    _, engine = random_game(board_size, seed=board_size, max_moves=board_size ** 3 // 2)
+
+    def run():
+        board = game.Board(board=engine.board, board_size=board_size, current_player="black", last_move="")
+        board.build_figure()
+        board.update_figure("Last move: A1-1 by black")
+    return run, 1
+
+
+BENCHMARKS = {
+    'make_move': bench_make_move,
+    'suicide': bench_suicide,
+    'capture': bench_capture,
+    'territory': bench_territory,
+    'render_3d': bench_render_3d,
+}
+
+
+def measure(run, operations, repeat, min_time=0.2):
+    """Best seconds per operation over `repeat` rounds, each looping the benchmark for at least min_time."""
+    run()
+    best = float('inf')
+    for _ in range(repeat):
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / (loops * operations))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--only', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5, help="rounds per benchmark, the best is kept")
+    parser.add_argument('--save', default=None, help="write the results to this baseline file")
+    parser.add_argument('--compare', default=None, help="compare the results with this baseline file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slow-down before a regression")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':>12} {'size':>4} {'us/op':>12} {'baseline':>12} {'ratio':>6}")
+    for name in args.only:
+        for board_size in args.sizes:
+            bench = BENCHMARKS[name](board_size)
+            if bench is None:
+                print(f"{name:>12} {board_size:>4} {'skipped':>12}")
+                continue
+            key = f"{name}[{board_size}]"
+            results[key] = seconds = measure(*bench, repeat=args.repeat)
+
+            line = f"{name:>12} {board_size:>4} {seconds * 1e6:>12.2f}"
+            if key in baseline:
+                ratio = seconds / baseline[key]
+                line += f" {baseline[key] * 1e6:>12.2f} {ratio:>6.2f}"
+                if ratio > 1 + args.tolerance:
+                    regressions.append(key)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'numpy': np.__version__, 'results': results}, f, indent=1)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())